@@ -7,26 +7,70 @@ Created on Sat Sep 14 23:44:20 2019
 
 import numpy as np
 
+from precision import working
+
+
+def _window_mean(a, n, csum):
+    """
+    沿点轴做宽度为n的滑动平均，结果原地写回a
+
+    窗口覆盖 [i - (n - n//2 - 1), i + n//2]，边缘处窗口收缩为有效点的平均，
+    与 np.convolve(mode="full") 加边缘权重修正的结果一致。
+    csum 为形状 (row, col + 1) 的累加和缓冲区，可在多次调用间复用；
+    使用 float64 缓冲区可避免 float32 数据在长光谱上累加时损失精度。
+    """
+    col = a.shape[1]
+    j = n // 2
+    k = n - j - 1
+    csum[:, 0] = 0
+    np.cumsum(a, axis=1, out=csum[:, 1:])
+
+    if col < n - 1:
+        # 光谱比窗口还短：逐点计算收缩窗口的范围
+        idx = np.arange(col)
+        hi = np.minimum(idx + j + 1, col)
+        lo = np.maximum(idx - k, 0)
+        np.subtract(csum[:, hi], csum[:, lo], out=a)
+        a /= hi - lo
+        return a
+
+    # 中间部分：完整窗口
+    np.subtract(csum[:, n:], csum[:, :col + 1 - n], out=a[:, k:col - j])
+    a[:, k:col - j] /= n
+    # 左边缘：窗口左端截断于第0点
+    np.subtract(csum[:, j + 1:j + 1 + k], csum[:, :1], out=a[:, :k])
+    a[:, :k] /= np.arange(j + 1, j + 1 + k)
+    # 右边缘：窗口右端截断于最后一点
+    np.subtract(csum[:, col:], csum[:, col - n + 1:col - k], out=a[:, col - j:])
+    a[:, col - j:] /= np.arange(n - 1, k, -1)
+    return a
+
 
 def MWA(arr, n=6, it=1, mode="full"):
-    row = arr.shape[0]
-    col = arr.shape[1]
-    average = np.zeros((row, col))
+    """
+    滑动窗口平均平滑
+
+    参数:
+        arr: 输入光谱 (n_samples, n_points)
+        n: 窗口宽度
+        it: 平滑次数，第k次 (从0计) 使用的窗口宽度为 n - 2 * (it - 1 - k)
+        mode: 仅支持"full" (保留该参数以兼容旧的调用方式)
+
+    返回:
+        平滑后的光谱，形状与arr相同，dtype按精度策略
+    """
+    if mode != "full":
+        raise ValueError("MWA仅支持mode='full'")
+    average = np.array(working(arr))
+    row, col = average.shape
     ns = []
     for _ in range(it):
         ns.append(n)
         n -= 2
-    for i in range(row):
-        average[i] = arr[i].copy()
-        nn = ns.copy()
-        for _ in range(it):
-            n = nn.pop()
-            if n > 1:
-                tmp = np.convolve(average[i], np.ones((n,)) / n, mode=mode)
-                for j in range(1, n):
-                    tmp[j - 1] = tmp[j - 1] * n / j
-                    tmp[-j] = tmp[-j] * n / j
-                j = int(n / 2)
-                k = n - j - 1
-                average[i] = tmp[j:-k]
+    # 所有光谱一次处理，多次平滑复用同一个累加和缓冲区
+    csum = np.empty((row, col + 1))
+    while ns:
+        n = ns.pop()
+        if n > 1:
+            _window_mean(average, n, csum)
     return average
@@ -5,13 +5,85 @@ Created on Sat Oct 12 21:04:10 2019
 @author: Administrator
 """
 """非对称加权惩罚最小二乘基线校准"""
+from functools import lru_cache
+
 import numpy as np
-from scipy import sparse
-from scipy.sparse.linalg import spsolve
+from scipy.linalg import solveh_banded
+
+from precision import result_dtype
+from profiling import note_iterations
 #import matplotlib.pyplot as plt
 
 
-def baseline_als(y, lam, p, niter=10, tol=1e-6):
+@lru_cache(maxsize=16)
+def _second_diff_banded(L):
+    """
+    二阶差分惩罚矩阵 D'D 的上三角带状存储 (solveh_banded 格式)
+
+    D'D 为五对角对称矩阵，直接按带状形式构造，避免生成 L×L 稠密矩阵。
+    返回形状为 (3, L) 的只读数组：第0行为第二上对角线，第1行为第一上对角线，
+    第2行为主对角线。
+    """
+    ab = np.zeros((3, L))
+    if L >= 3:
+        # D 的每一行为 [1, -2, 1]，逐行累加其外积的贡献
+        ab[2, :-2] += 1
+        ab[2, 1:-1] += 4
+        ab[2, 2:] += 1
+        ab[1, 1:-1] -= 2
+        ab[1, 2:] -= 2
+        ab[0, 2:] = 1
+    ab.flags.writeable = False
+    return ab
+
+
+@lru_cache(maxsize=16)
+def _penalty_banded(L, lam):
+    """按 (L, lam) 缓存 lam * D'D 的带状存储"""
+    ab = lam * _second_diff_banded(L)
+    ab.flags.writeable = False
+    return ab
+
+
+def _weights(y, z, p):
+    return p * (y > z) + (1 - p) * (y < z)
+
+
+def _warm_rows(y, penalty, p, niter, wtol, result, iterations):
+    """
+    热启动模式：按行顺序处理，每条光谱的初始权重由上一条光谱的基线与本条数据比较得到
+
+    每次迭代求解标准AsLS的 (W + lam * D'D) z = W y，权重的相对变化
+    sum|w_new - w| / sum(w_new) 不超过wtol时停止。
+    相邻光谱基线相近时，通常一两次迭代即可收敛。
+
+    默认模式的右端项为上一次的基线 W z，每次迭代都会把基线再平滑一次，
+    结果由迭代次数决定 (没有与数据相关的不动点)，无法从别的起点热启动得到相同结果，
+    因此热启动模式改用标准AsLS，得到的基线与默认模式不同。
+    """
+    ab = np.empty_like(penalty)
+    z = None
+    for j in range(y.shape[0]):
+        yj = y[j].astype(np.float64)
+        w = np.ones(y.shape[1]) if z is None else _weights(yj, z, p)
+        count = 0
+        while count < niter:
+            count += 1
+            np.copyto(ab, penalty)
+            ab[2] += w
+            z = solveh_banded(ab, w * yj, overwrite_ab=True,
+                              check_finite=False)
+            w_new = _weights(yj, z, p)
+            changed = np.abs(w_new - w).sum()
+            w = w_new
+            if changed <= wtol * w.sum():
+                break
+        result[j] = yj - z
+        iterations[j] = count
+
+
+def baseline_als(y, lam, p, niter=10, tol=1e-6, warm_start=False, wtol=1e-3,
+                 return_iterations=False):
     """
     改进的AsLS算法
 
@@ -19,36 +91,58 @@ def baseline_als(y, lam, p, niter=10, tol=1e-6):
         y: 输入光谱 (n_samples, n_points)
         lam: 平滑系数 (典型值1e5-1e12)
         p: 非对称系数 (0-1, 典型值0.001-0.1)
-        niter: 最大迭代次数
+        niter: 最大迭代次数 (至少为1)
         tol: 收敛阈值
+        warm_start: 为True时按行顺序以上一条光谱的基线为起点 (适合时间序列和面扫描数据)，
+                    使用标准AsLS迭代和基于权重相对变化的停止条件，
+                    得到的基线与默认模式不同 (见 _warm_rows)
+        wtol: 热启动模式下权重相对变化的收敛阈值
+        return_iterations: 为True时同时返回每条光谱的迭代次数
 
     返回:
-        基线校正后的光谱
+        基线校正后的光谱 (带状求解在float64下进行，输出dtype按精度策略)；
+        return_iterations为True时返回 (光谱, 迭代次数)
     """
     if np.any(np.isnan(y)):
         raise ValueError("输入数据包含NaN值")
+    if niter < 1:
+        raise ValueError(f"迭代次数niter应至少为1，实际为{niter}")
 
-    y = np.asarray(y, dtype=np.float64)
+    y = np.asarray(y)
     L = y.shape[1]
-    D = sparse.csc_matrix(np.diff(np.eye(L), 2))
-    result = np.zeros_like(y)
+    penalty = _penalty_banded(L, float(lam))
+    ab = np.empty_like(penalty)
+    result = np.empty(y.shape, dtype=result_dtype(y.dtype))
+    iterations = np.zeros(y.shape[0], dtype=int)
+
+    if warm_start:
+        _warm_rows(y, penalty, p, niter, wtol, result, iterations)
+        note_iterations(iterations)
+        return (result, iterations) if return_iterations else result
 
     for j in range(y.shape[0]):
         w = np.ones(L)
-        y_curr = y[j].copy()
+        yj = y[j].astype(np.float64)
+        y_curr = yj
+        count = 0
 
-        for _ in range(niter):
-            W = sparse.spdiags(w, 0, L, L)
-            Z = W + lam * D.dot(D.transpose())
-            z = spsolve(Z, w * y_curr)
+        while count < niter:
+            count += 1
+            # W + lam * D'D 为五对角正定矩阵，每次迭代只需 O(L) 的带状Cholesky求解
+            np.copyto(ab, penalty)
+            ab[2] += w
+            z = solveh_banded(ab, w * y_curr, overwrite_ab=True,
+                              check_finite=False)
 
             # 检查收敛
             if np.max(np.abs(z - y_curr)) < tol:
                 break
 
-            w = p * (y[j] > z) + (1 - p) * (y[j] < z)
+            w = _weights(yj, z, p)
             y_curr = z
 
-        result[j] = y[j] - z
+        result[j] = yj - z
+        iterations[j] = count
 
-    return result
+    note_iterations(iterations)
+    return (result, iterations) if return_iterations else result
@@ -6,9 +6,35 @@ Created on Fri Nov  8 11:56:40 2019
 """
 
 "I-ModPoly: improved modified multi-polynomial fit method"
+from functools import lru_cache
+
 import numpy as np
-import copy
-import matplotlib.pyplot as plt
+
+from precision import result_dtype
+from profiling import note_iterations
+
+
+@lru_cache(maxsize=8)
+def _vandermonde_basis_cached(buf, polyorder):
+    x = np.frombuffer(buf, dtype=np.float64)
+    # 将波数缩放到[-1, 1]以改善范德蒙矩阵的条件数，拟合值不受影响
+    span = x.max() - x.min()
+    xs = (x - x.min()) * (2.0 / span) - 1.0 if span > 0 else x - x.min()
+    V = np.polynomial.polynomial.polyvander(xs, polyorder)
+    Q, _ = np.linalg.qr(V)
+    Q.flags.writeable = False
+    return Q
+
+
+def _vandermonde_basis(wavenumbers, polyorder):
+    """
+    缩放范德蒙矩阵的正交基 (按 (wavenumbers, polyorder) 缓存)
+
+    返回形状为 (n_points, polyorder+1) 的列正交矩阵 Q，
+    多项式拟合值即为 y @ Q @ Q.T，与 np.polyfit/np.polyval 的结果一致。
+    """
+    x = np.ascontiguousarray(wavenumbers, dtype=np.float64).ravel()
+    return _vandermonde_basis_cached(x.tobytes(), int(polyorder))
 
 
 def IModPoly(wavenumbers, originalRaman, polyorder, max_iter=100, tolerance=0.005):
@@ -23,43 +49,41 @@ def IModPoly(wavenumbers, originalRaman, polyorder, max_iter=100, tolerance=0.00
         tolerance: 收敛容差 (默认0.005)
 
     返回:
-        校正后的光谱，形状与originalRaman相同
+        校正后的光谱，形状与originalRaman相同 (拟合在float64下进行，输出dtype按精度策略)
     """
+    dtype = result_dtype(np.asarray(originalRaman).dtype)
+    originalRaman = np.asarray(originalRaman, dtype=np.float64)
     row, col = originalRaman.shape
-    corrected = np.zeros((row, col))
-
-    for j in range(row):
-        prev_spectrum = originalRaman[j]
-        curr_spectrum = prev_spectrum.copy()
-        prev_std = 0
-        converged = False
-        iteration = 1
-
-        while not converged and iteration <= max_iter:
-            # 多项式拟合
-            coeffs = np.polyfit(wavenumbers, curr_spectrum, polyorder)
-            fitted = np.polyval(coeffs, wavenumbers)
-            residual = curr_spectrum - fitted
-            curr_std = np.std(residual)
-
-            # 光谱修正
-            if iteration == 1:
-                # 首次迭代：去除明显峰
-                mask = prev_spectrum > (fitted + curr_std)
-                curr_spectrum[mask] = fitted[mask] + curr_std
-            else:
-                # 后续迭代：重建模型
-                mask = prev_spectrum < (fitted + curr_std)
-                curr_spectrum = np.where(mask, prev_spectrum, fitted + curr_std)
-
-            # 检查收敛条件
-            relative_change = abs((curr_std - prev_std) / curr_std)
-            converged = relative_change < tolerance
-
-            prev_spectrum = curr_spectrum
-            prev_std = curr_std
-            iteration += 1
-
-        corrected[j] = originalRaman[j] - fitted
-
-    return corrected
\ No newline at end of file
+    Q = _vandermonde_basis(wavenumbers, polyorder)
+
+    curr_spectrum = originalRaman.copy()
+    fitted = np.zeros((row, col))
+    prev_std = np.zeros(row)
+    iterations = np.zeros(row, dtype=int)
+    # 所有光谱一起迭代，已收敛的光谱不再参与计算
+    active = np.arange(row)
+    iteration = 1
+
+    while active.size and iteration <= max_iter:
+        curr = curr_spectrum[active]
+
+        # 多项式拟合 (最小二乘投影)
+        fit = (curr @ Q) @ Q.T
+        curr_std = np.std(curr - fit, axis=1)
+
+        # 光谱修正：高于拟合值+标准差的点被截断 (首次迭代即去除明显峰)
+        np.minimum(curr, fit + curr_std[:, None], out=curr)
+        curr_spectrum[active] = curr
+        fitted[active] = fit
+        iterations[active] += 1
+
+        # 检查收敛条件
+        with np.errstate(divide='ignore', invalid='ignore'):
+            relative_change = np.abs((curr_std - prev_std[active]) / curr_std)
+        prev_std[active] = curr_std
+        active = active[~(relative_change < tolerance)]
+        iteration += 1
+
+    note_iterations(iterations)
+    np.subtract(originalRaman, fitted, out=fitted)
+    return fitted.astype(dtype, copy=False)
@@ -1,42 +1,94 @@
+from functools import lru_cache
+
 import numpy as np
+from scipy.signal import lfilter
 
+from precision import working
 
-def Kalman(z, R):
-    # intial parameters
-    n_iter = 2000
-    sz = (n_iter,) # size of array
 
+@lru_cache(maxsize=16)
+def _kalman_gain(n_iter, Q, R, P0):
+    """
+    标量随机游走模型的卡尔曼增益序列 K[k] (按 (长度, Q, R, P0) 缓存)
 
-    Q = 1e-5 # process variance
+    增益只与 Q、R、P0 有关而与观测数据无关，因此可以预先算好，
+    滤波本身就变成一个时变系数的一阶 IIR 递推。
+    """
+    K = np.zeros(n_iter)   # gain or blending factor
+    P = P0                 # a posteri error estimate
+    for k in range(1, n_iter):
+        Pminus = P + Q             #P(k|k-1) = AP(k-1|k-1)A' + Q(k) ,A=1
+        K[k] = Pminus / (Pminus + R)  #Kg(k)=P(k|k-1)H'/[HP(k|k-1)H' + R],H=1
+        P = (1 - K[k]) * Pminus    #P(k|k) = (1 - Kg(k)H)P(k|k-1), H=1
+    K.flags.writeable = False
+    return K
 
 
-    # allocate space for arrays
-    xhat = np.zeros(sz)      # a posteri estimate of x
-    P = np.zeros(sz)         # a posteri error estimate
-    xhatminus = np.zeros(sz) # a priori estimate of x
-    Pminus = np.zeros(sz)    # a priori error estimate
-    K= np.zeros(sz)         # gain or blending factor
+def _steady_start(K, Q, R):
+    """返回增益收敛到稳态值的起始下标 (之后可按定常系数滤波)"""
+    if Q <= 0 or len(K) < 2:
+        return len(K), 0.0
+    Pminus = (Q + np.sqrt(Q * Q + 4 * Q * R)) / 2
+    K_inf = Pminus / (Pminus + R)
+    settled = np.abs(K[1:] - K_inf) <= 1e-12 * K_inf
+    # 增益序列单调收敛，第一个满足条件的下标之后均已稳态
+    idx = np.argmax(settled)
+    if not settled[idx]:
+        return len(K), K_inf
+    return idx + 1, K_inf
 
 
-    # intial guesses
-    xhat[0] = 0.0
-    P[0] = 1.0
+def Kalman(z, R, Q=1e-5, P0=1.0):
+    """
+    一维卡尔曼滤波
 
-    for k in range(1,n_iter):
-        # time update
-        xhatminus[k] = xhat[k-1]  #X(k|k-1) = AX(k-1|k-1) + BU(k) + W(k),A=1,BU(k) = 0
-        Pminus[k] = P[k-1]+Q      #P(k|k-1) = AP(k-1|k-1)A' + Q(k) ,A=1
+    参数:
+        z: 单条光谱 (n_points,)
+        R: 观测噪声方差
+        Q: 过程噪声方差 (默认1e-5)
+        P0: 初始误差估计 (默认1.0)
 
-        # measurement update
-        K[k] = Pminus[k]/( Pminus[k]+R ) #Kg(k)=P(k|k-1)H'/[HP(k|k-1)H' + R],H=1
-        xhat[k] = xhatminus[k]+K[k]*(z[k]-xhatminus[k]) #X(k|k) = X(k|k-1) + Kg(k)[Z(k) - HX(k|k-1)], H=1
-        P[k] = (1-K[k])*Pminus[k] #P(k|k) = (1 - Kg(k)H)P(k|k-1), H=1
-    return xhat
+    返回:
+        滤波后的光谱，长度与z相同
+    """
+    return KalmanF(np.asarray(z)[np.newaxis, :], R, Q, P0)[0]
+
+
+def KalmanF(xd, R, Q=1e-5, P0=1.0):
+    """
+    对整个光谱矩阵逐点做卡尔曼滤波，支持任意光谱长度
+
+    参数:
+        xd: 输入光谱 (n_samples, n_points)
+        R: 观测噪声方差
+        Q: 过程噪声方差 (默认1e-5)
+        P0: 初始误差估计 (默认1.0)
 
-def KalmanF (xd , R):
-    row = xd.shape[0]
-    col = xd.shape[1]
-    Fxd = np.zeros((row, col))
-    for i in range(row):
-        Fxd[i] = Kalman(xd[i], R)
-    return Fxd
\ No newline at end of file
+    返回:
+        滤波后的光谱，形状与xd相同，dtype按精度策略
+    """
+    z = working(xd)
+    row, col = z.shape
+    K = _kalman_gain(col, float(Q), float(R), float(P0))
+    s, K_inf = _steady_start(K, float(Q), float(R))
+
+    xhat = np.zeros((row, col), dtype=z.dtype)   # intial guesses: xhat[0] = 0
+
+    # 暂态段：时变增益，按 (点, 光谱) 排列后整列向量化递推
+    zt = np.ascontiguousarray(z[:, :s].T)
+    xt = np.zeros((s, row), dtype=z.dtype)
+    for k in range(1, s):
+        # X(k|k) = X(k|k-1) + Kg(k)[Z(k) - X(k|k-1)]
+        np.subtract(zt[k], xt[k - 1], out=xt[k])
+        xt[k] *= K[k]
+        xt[k] += xt[k - 1]
+    xhat[:, :s] = xt.T
+
+    # 稳态段：定常增益，等价于沿点轴的一阶 IIR 滤波
+    if s < col:
+        zi = ((1 - K_inf) * xt[s - 1][:, np.newaxis]).astype(z.dtype)
+        xhat[:, s:], _ = lfilter(np.array([K_inf], dtype=z.dtype),
+                                 np.array([1, -(1 - K_inf)], dtype=z.dtype),
+                                 z[:, s:], axis=1, zi=zi)
+
+    return xhat
@@ -6,15 +6,22 @@ Created on Sat Sep 28 20:21:06 2019
 """
 import numpy as np
 
+from precision import working
 
-def LPnorm(arr, ord):
-    row = arr.shape[0]
-    col = arr.shape[1]
-    Lpdata = np.zeros((row, col))
-    for i in range(row):
-        Lp = np.linalg.norm(arr[i,:], ord)
-        if Lp !=0 :
-            Lpdata[i,:] = arr[i,:] / Lp
-        else:
-            Lpdata[i,:] = arr[i,:]
-    return Lpdata
+
+def LPnorm(arr, ord, out=None):
+    """
+    逐行Lp范数归一化，范数为0的光谱保持不变
+
+    参数:
+        arr: 输入光谱 (n_samples, n_points)
+        ord: 范数阶数 (如 np.inf、10、4)
+        out: 可选的输出数组 (可以就是arr本身)
+
+    范数在float64下计算 (高阶范数的幂次在float32下容易溢出)，输出dtype按精度策略。
+    """
+    arr = working(arr)
+    Lp = np.linalg.norm(arr.astype(np.float64, copy=False), ord, axis=1,
+                        keepdims=True)
+    Lp[Lp == 0] = 1
+    return np.divide(arr, Lp, out=out, dtype=arr.dtype, casting='same_kind')
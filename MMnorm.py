@@ -6,10 +6,12 @@ Created on Thu Nov 14 17:44:35 2019
 """
 
 import numpy as np
+
+from precision import result_dtype
 def MaMinorm(Oarr):
     row = Oarr.shape[0]
     col = Oarr.shape[1]
-    MMarr = np.zeros((row, col))
+    MMarr = np.zeros((row, col), dtype=result_dtype(Oarr.dtype))
     permax = np.ones((1, col))
     for i in range(row):
         diff = np.max(Oarr[i]) - np.min(Oarr[i])
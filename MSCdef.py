@@ -5,29 +5,63 @@ Created on Sat Sep 28 17:11:34 2019
 @author: Administrator
 """
 import numpy as np
-from sklearn.linear_model import LinearRegression
+
+from precision import result_dtype
+
+
+class MultiplicativeScatterCorrection:
+    """
+    多元散射校正 (MSC)
+
+    fit(reference_set) 只保存一次参考光谱 (参考集的平均光谱)，
+    transform(new_batch) 用闭式最小二乘一次性求出每条光谱相对参考光谱的
+    斜率k与截距b，并返回 (x - b) / k。新采集的光谱可直接按已有参考校正，无需重新拟合。
+    """
+
+    def __init__(self):
+        self.reference_ = None
+
+    def fit(self, reference_set):
+        """
+        参数:
+            reference_set: 参考光谱集 (n_samples, n_points)，或单条参考光谱 (n_points,)
+        """
+        reference_set = np.asarray(reference_set, dtype=np.float64)
+        if reference_set.ndim == 1:
+            M = reference_set.copy()
+        else:
+            M = np.mean(reference_set, axis=0)
+        self.reference_ = M
+        self._centered = M - M.mean()
+        self._ss = np.dot(self._centered, self._centered)
+        return self
+
+    def transform(self, new_batch):
+        """
+        参数:
+            new_batch: 待校正光谱 (n_samples, n_points)
+
+        返回:
+            校正后的光谱，形状与new_batch相同 (回归系数按float64计算，输出dtype按精度策略)
+        """
+        if self.reference_ is None:
+            raise ValueError("请先调用fit设置参考光谱")
+        sdata = np.asarray(new_batch)
+        if sdata.shape[-1] != self.reference_.shape[0]:
+            raise ValueError("光谱点数与参考光谱不一致")
+        y = sdata.astype(np.float64, copy=False)
+
+        # y = k * M + b 的闭式解：k = <y, M - mean(M)> / ||M - mean(M)||^2
+        k = (y @ self._centered) / self._ss
+        b = y.mean(axis=-1) - k * self.reference_.mean()
+
+        spec_msc = np.subtract(y, b[..., None], dtype=result_dtype(sdata.dtype))
+        spec_msc /= k[..., None]
+        return spec_msc
+
+    def fit_transform(self, sdata):
+        return self.fit(sdata).transform(sdata)
 
 
 def MSC(sdata):
-    n = sdata.shape[0]  # 样本数量
-    k = np.zeros(sdata.shape[0])
-    b = np.zeros(sdata.shape[0])
- 
-    M = np.mean(sdata, axis=0)
- 
-    for i in range(n):
-        y = sdata[i, :]
-        y = y.reshape(-1, 1)
-        M = M.reshape(-1, 1)
-        model = LinearRegression()
-        model.fit(M, y)
-        k[i] = model.coef_
-        b[i] = model.intercept_
-#global spec_msc
-    spec_msc = np.zeros_like(sdata)
-    for i in range(n):
-        bb = np.repeat(b[i], sdata.shape[1])
-        kk = np.repeat(k[i], sdata.shape[1])
-        temp = (sdata[i, :] - bb)/kk
-        spec_msc[i, :] = temp
-    return spec_msc
+    return MultiplicativeScatterCorrection().fit_transform(sdata)
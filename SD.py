@@ -1,4 +1,4 @@
-import numpy as np
+from savgol import difference
 
 def D2(sdata):
     """
@@ -8,13 +8,4 @@ def D2(sdata):
     返回:
         二阶差分结果，形状与输入相同
     """
-    row = sdata.shape[0]
-    col = sdata.shape[1]
-    D2_result = np.zeros((row, col))
-    for i in range(row):
-        tem = np.diff(sdata[i], 2)
-        temp = tem.tolist()
-        temp.append(temp[-1])
-        temp.append(temp[-1])
-        D2_result[i] = temp
-    return D2_result
\ No newline at end of file
+    return difference(sdata, 2)
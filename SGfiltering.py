@@ -8,14 +8,18 @@ Created on Sat Sep 29 10:06:02 2018
 '"sgolayfilt滤波器"对光谱进行滤波处理，并保存结果'
 "**********************************************"
 "scipy.signal.savgol_filter滤波（参数设置）"
-from scipy.signal import savgol_filter
-import numpy as np
+from savgol import savgol
 
 
-def SGfilter(Intensity, point, degree):  # 输入均为行
-    Row = Intensity.shape[0]
-    col = Intensity.shape[1]
-    sgsmooth = np.zeros((Row, col))
-    for i in range(Row):
-        sgsmooth[i] = savgol_filter(Intensity[i], point, degree)
-    return sgsmooth
+def SGfilter(Intensity, point, degree, deriv=0, delta=1.0):  # 输入均为行
+    """
+    SG平滑，deriv>0时在同一次卷积中完成平滑与求导
+
+    参数:
+        Intensity: 输入光谱 (n_samples, n_points)
+        point: 窗口宽度 (奇数)
+        degree: 多项式阶数
+        deriv: 导数阶数 (默认0，仅平滑)
+        delta: 采样间隔，用于导数的缩放
+    """
+    return savgol(Intensity, point, degree, deriv=deriv, delta=delta)
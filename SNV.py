@@ -11,6 +11,8 @@ Created on Wed Nov 14 21:52:28 2018
 '''
 import numpy as np
 
+from precision import result_dtype
+
 
 def standardization(Datamat):
     mu = np.average(Datamat)
@@ -25,7 +27,7 @@ def standardization(Datamat):
 def plotst(Data):
     row = Data.shape[0]
     col = Data.shape[1]
-    st_Data = np.zeros((row, col))
+    st_Data = np.zeros((row, col), dtype=result_dtype(Data.dtype))
     for i in range(row):
         st_Data[i] = standardization(Data[i])
     return st_Data
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+批量处理命令行工具
+
+按处理配方 (与界面中 "应用处理" 生成的配方相同，可在界面中下载) 对一批光谱文件
+做预处理，多个文件在进程池中并行处理，结果写入输出目录。输出文件比输入文件、
+配方和波数文件都新时视为已是最新，重新运行时跳过，因此中断后可直接续跑。
+
+用法:
+    python batch.py recipe.json "data/*.txt" out/ --wavenumbers wn.txt
+    python batch.py recipe.json "data/**/*.txt" out/ --format npz --workers 8
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from export import FORMATS, export_file
+from loader import load_spectra, load_wavenumbers
+from pipeline import Pipeline
+from precision import POLICIES
+from profiling import Profiler, logger as profile_logger
+
+
+def load_recipe(path):
+    """读取配方JSON：配方列表，或包含 "recipe" 键的对象"""
+    with open(path, encoding="utf-8") as f:
+        recipe = json.load(f)
+    if isinstance(recipe, dict):
+        recipe = recipe["recipe"]
+    # 提前检查方法名和步骤顺序
+    return Pipeline.from_recipe(recipe).to_recipe()
+
+
+def output_path(src, out_dir, fmt):
+    stem = os.path.splitext(os.path.basename(src))[0]
+    return os.path.join(out_dir, stem + FORMATS[fmt][0])
+
+
+def is_up_to_date(src, dst, depends=()):
+    """dst 存在且不早于 src 及其他依赖文件时返回True"""
+    if not os.path.exists(dst):
+        return False
+    mtime = os.path.getmtime(dst)
+    return all(os.path.getmtime(p) <= mtime for p in (src, *depends) if p)
+
+
+def process_file(src, dst, recipe, wavenumbers=None, fmt="txt",
+                 layout="columns", precision=None, profile=False):
+    """
+    处理单个文件 (在工作进程中执行)
+
+    结果先写入临时文件再改名，中断时不会留下不完整的输出。
+
+    返回:
+        处理信息的字典 (光谱条数、点数、耗时、可选的各步骤记录)
+    """
+    t0 = time.perf_counter()
+    y = load_spectra(src, layout=layout)
+    if wavenumbers is not None and len(wavenumbers) != y.shape[1]:
+        raise ValueError(f"波数长度 ({len(wavenumbers)}) 与数据点数 ({y.shape[1]}) 不匹配")
+    pipeline = Pipeline.from_recipe(recipe)
+    profiler = Profiler(memory=False) if profile else None
+    result = pipeline.run(y, wavenumbers, profiler=profiler, precision=precision)
+    tmp = dst + ".part"
+    try:
+        export_file(tmp, result, wavenumbers, fmt=fmt, recipe=recipe,
+                    label=pipeline.label)
+        os.replace(tmp, dst)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return {"n_spectra": y.shape[0], "n_points": y.shape[1],
+            "seconds": time.perf_counter() - t0,
+            "profile": profiler.to_dicts() if profiler else None}
+
+
+def run(recipe, sources, out_dir, wavenumbers=None, fmt="txt", layout="columns",
+        precision=None, workers=None, max_pending=None, force=False,
+        depends=(), profile=False, log=print):
+    """
+    批量处理文件
+
+    参数:
+        recipe: 处理配方列表
+        sources: 输入文件路径列表
+        out_dir: 输出目录
+        wavenumbers: 所有文件共用的波数一维数组
+        fmt: 输出格式，见 export.FORMATS
+        layout: 输入文件的数据排列方式，见 loader.load_spectra
+        precision: 精度策略，见 precision 模块
+        workers: 进程数，默认为CPU核数；为1时在当前进程中依次处理
+        max_pending: 同时提交的任务数上限 (限制内存占用)，默认为 workers 的2倍
+        force: 为True时不跳过已是最新的输出
+        depends: 其他依赖文件 (如配方和波数文件)，比输出新时重新处理
+        profile: 为True时每个文件的各步骤记录以JSON日志输出
+        log: 进度输出函数
+
+    返回:
+        (成功数, 跳过数, 失败的 [(文件, 错误信息)])
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    tasks, skipped = [], 0
+    seen = {}
+    for src in sources:
+        dst = output_path(src, out_dir, fmt)
+        if dst in seen:
+            raise ValueError(f"输出文件名冲突: {seen[dst]} 与 {src}")
+        seen[dst] = src
+        if not force and is_up_to_date(src, dst, depends):
+            skipped += 1
+        else:
+            tasks.append((src, dst))
+    total = len(tasks)
+    log(f"共 {len(sources)} 个文件，跳过 {skipped} 个已是最新的输出，待处理 {total} 个")
+
+    done, failed = 0, []
+    t0 = time.perf_counter()
+
+    def report(src, info=None, error=None):
+        nonlocal done
+        if error is not None:
+            failed.append((src, error))
+            log(f"[{done + len(failed)}/{total}] 失败 {src}: {error}")
+            return
+        done += 1
+        finished = done + len(failed)
+        eta = (time.perf_counter() - t0) / finished * (total - finished)
+        log(f"[{finished}/{total}] {src} {info['n_spectra']}×{info['n_points']} "
+            f"{info['seconds']:.2f}s，预计剩余 {eta:.0f}s")
+        if info["profile"]:
+            for rec in info["profile"]:
+                profile_logger.info(json.dumps({"file": src, **rec},
+                                               ensure_ascii=False))
+
+    args = (recipe, wavenumbers, fmt, layout, precision, profile)
+    if workers == 1:
+        for src, dst in tasks:
+            try:
+                report(src, process_file(src, dst, *args))
+            except Exception as e:
+                report(src, error=repr(e))
+        return done, skipped, failed
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    queue = iter(tasks)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        while True:
+            # 只保持有限个任务在途，已提交任务的数据不会一次全部堆积在内存中
+            while len(pending) < max_pending:
+                task = next(queue, None)
+                if task is None:
+                    break
+                pending[pool.submit(process_file, *task, *args)] = task[0]
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                src = pending.pop(fut)
+                try:
+                    report(src, fut.result())
+                except Exception as e:
+                    report(src, error=repr(e))
+    return done, skipped, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="光谱文件批量预处理")
+    parser.add_argument("recipe", help="处理配方JSON文件")
+    parser.add_argument("inputs", nargs="+", help="输入文件或通配符 (支持 **)")
+    parser.add_argument("out_dir", help="输出目录")
+    parser.add_argument("--wavenumbers", help="波数文件 (所有输入文件共用)")
+    parser.add_argument("--format", default="txt", choices=list(FORMATS),
+                        help="输出格式")
+    parser.add_argument("--layout", default="columns", choices=["columns", "rows"],
+                        help="输入数据排列方式：每列一条光谱或每行一条光谱")
+    parser.add_argument("--precision", choices=POLICIES, help="精度策略")
+    parser.add_argument("--workers", type=int, help="进程数，默认为CPU核数")
+    parser.add_argument("--max-pending", type=int, help="同时在途的任务数上限")
+    parser.add_argument("--force", action="store_true", help="重新处理所有文件")
+    parser.add_argument("--profile", action="store_true",
+                        help="以JSON日志输出每个文件各步骤的耗时")
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+    recipe = load_recipe(args.recipe)
+    wavenumbers = load_wavenumbers(args.wavenumbers) if args.wavenumbers else None
+    sources = []
+    for pattern in args.inputs:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        sources.extend(p for p in matches if os.path.isfile(p))
+    if not sources:
+        print("没有匹配的输入文件", file=sys.stderr)
+        return 1
+
+    done, skipped, failed = run(
+        recipe, sources, args.out_dir, wavenumbers, args.format, args.layout,
+        args.precision, args.workers, args.max_pending, args.force,
+        depends=(args.recipe, args.wavenumbers), profile=args.profile,
+        log=lambda msg: print(msg, file=sys.stderr, flush=True))
+    print(f"完成 {done} 个，跳过 {skipped} 个，失败 {len(failed)} 个",
+          file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
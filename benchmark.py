@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+预处理函数性能基准
+
+在合成的类拉曼光谱 (洛伦兹峰 + 多项式基线 + 噪声) 上，按不同的光谱条数和数据点数
+运行各预处理函数，记录耗时、峰值内存和吞吐量 (条/秒)，追加到JSON历史文件，
+并与保存的基准结果比较，标出变慢的项目。无需图形界面，可在普通CPU服务器上运行。
+
+用法:
+    python benchmark.py                      # 快速网格
+    python benchmark.py --full               # 10~50000条 × 500~16000点
+    python benchmark.py --cases AsLS,MWM --spectra 100,1000 --points 2000
+    python benchmark.py --save-baseline      # 将本次结果保存为基准
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+QUICK_SPECTRA = (10, 100, 1000)
+QUICK_POINTS = (500, 2000)
+FULL_SPECTRA = (10, 100, 1000, 10000, 50000)
+FULL_POINTS = (500, 2000, 4000, 16000)
+# 与参考项目比较结果的项目：名称 -> 参考项目名称
+REFERENCES = {"AsLS-warm": "AsLS"}
+# 元素个数不超过该值时计算与参考项目结果的差异
+MAX_CHECK_CELLS = 1e6
+
+
+def synthetic_spectra(n_spectra, n_points, n_peaks=12, seed=0, block_rows=None):
+    """
+    生成类拉曼合成光谱
+
+    按行块写入预分配的结果，临时数组只有一个块的大小，
+    完整网格中最大的规模 (50000条 × 16000点) 也只需约一份数据的内存。
+
+    返回:
+        (wavenumbers, spectra)，spectra 形状为 (n_spectra, n_points)
+    """
+    rng = np.random.default_rng(seed)
+    wavenumbers = np.linspace(400, 2000, n_points)
+    t = np.linspace(-1, 1, n_points)
+    # 三阶多项式基线 (荧光背景)
+    coef = rng.normal([1000, 300, -200, 50], [200, 100, 50, 20], (n_spectra, 4))
+    # 洛伦兹峰：峰位在各光谱间有少量漂移
+    centers = rng.uniform(450, 1950, n_peaks)
+    widths = rng.uniform(3, 15, n_peaks)
+    amps = rng.uniform(100, 1000, (n_peaks, n_spectra, 1))
+    shifts = rng.normal(0, 1, (n_peaks, n_spectra, 1))
+
+    spectra = np.empty((n_spectra, n_points))
+    if block_rows is None:
+        block_rows = max(1, (4 << 20) // (8 * n_points))
+    for r0 in range(0, n_spectra, block_rows):
+        r1 = min(r0 + block_rows, n_spectra)
+        block = spectra[r0:r1]
+        block[...] = np.polynomial.polynomial.polyval(t, coef[r0:r1].T)
+        for c, w, amp, shift in zip(centers, widths, amps, shifts):
+            block += amp[r0:r1] / (1 + ((wavenumbers - c - shift[r0:r1]) / w) ** 2)
+        block += rng.normal(0, 5, block.shape)
+    return wavenumbers, spectra
+
+
+def _cases():
+    """基准项目：名称 -> func(wavenumbers, spectra)，依赖缺失的项目跳过"""
+    cases = {}
+
+    def add(name, module, build):
+        try:
+            mod = __import__(module)
+        except ImportError as e:
+            print(f"跳过 {name}: {e}", file=sys.stderr)
+            return
+        cases[name] = build(mod)
+
+    add("AsLS", "AsLS", lambda m: lambda wn, y: m.baseline_als(y, 1e7, 0.1))
+    add("AsLS-warm", "AsLS",
+        lambda m: lambda wn, y: m.baseline_als(y, 1e7, 0.1, warm_start=True))
+    add("I-ModPoly", "IModPoly", lambda m: lambda wn, y: m.IModPoly(wn, y, 6))
+    add("SG", "SGfiltering", lambda m: lambda wn, y: m.SGfilter(y, 11, 3))
+    add("FD", "FD", lambda m: lambda wn, y: m.D1(y))
+    add("SD", "SD", lambda m: lambda wn, y: m.D2(y))
+    add("MWA", "ArithmeticAverage", lambda m: lambda wn, y: m.MWA(y, 7, 2))
+    add("MWM", "meadianfiltering", lambda m: lambda wn, y: m.MWM(y, 7, 2))
+    add("Kalman", "KalmanFiltering", lambda m: lambda wn, y: m.KalmanF(y, 0.01))
+    add("FFT", "fft", lambda m: lambda wn, y: m.Smfft(y, 51))
+    add("wavelet", "wavelettransform", lambda m: lambda wn, y: m.waveletlinear(y))
+    add("MSC", "MSCdef", lambda m: lambda wn, y: m.MSC(y))
+    add("SNV", "SNV", lambda m: lambda wn, y: m.plotst(y))
+    add("LPnorm", "LPnorm", lambda m: lambda wn, y: m.LPnorm(y, 4))
+    add("MMnorm", "MMnorm", lambda m: lambda wn, y: m.MaMinorm(y))
+    add("sigmoid", "sigmoids", lambda m: lambda wn, y: m.sigmoid(y / 1000))
+    add("squashing", "squashing", lambda m: lambda wn, y: m.squashing(y / 1000))
+    add("i_sigmoid", "i_sigmoid", lambda m: lambda wn, y: m.i_sigmoid(y))
+    add("i_squashing", "i_squashing", lambda m: lambda wn, y: m.i_squashing(y))
+    return cases
+
+
+def measure(func, wavenumbers, spectra, repeat=3):
+    """
+    返回 (最短耗时秒数, 峰值内存MB)
+
+    耗时取多次运行的最小值；峰值内存用 tracemalloc 单独运行一次测得
+    (tracemalloc 会拖慢运行，因此不与计时同时进行)。
+    """
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func(wavenumbers, spectra)
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        func(wavenumbers, spectra)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 2 ** 20
+
+
+def run(case_names=None, spectra_sizes=QUICK_SPECTRA, point_sizes=QUICK_POINTS,
+        repeat=3, max_seconds=30.0, max_cells=None, verbose=True):
+    """
+    运行基准网格
+
+    参数:
+        case_names: 要运行的项目名称列表，默认全部
+        spectra_sizes, point_sizes: 光谱条数与数据点数的网格
+        repeat: 计时重复次数
+        max_seconds: 某项目单次运行超过该时长后，不再运行该项目更大的规模
+        max_cells: 单个数据矩阵元素个数上限，超过的规模跳过 (内存不足的机器上使用)，
+                   默认不限制
+
+    返回:
+        结果记录列表
+    """
+    cases = _cases()
+    if case_names:
+        unknown = set(case_names) - set(cases)
+        if unknown:
+            raise ValueError(f"未知的基准项目: {', '.join(sorted(unknown))}")
+        cases = {k: cases[k] for k in case_names}
+
+    results = []
+    too_slow = {}
+    for n_points in sorted(point_sizes):
+        for n_spectra in sorted(spectra_sizes):
+            if max_cells is not None and n_spectra * n_points > max_cells:
+                continue
+            wavenumbers, spectra = synthetic_spectra(n_spectra, n_points)
+            for name, func in cases.items():
+                # 更小规模已超时的项目跳过
+                if too_slow.get(name, np.inf) <= n_spectra * n_points:
+                    continue
+                seconds, peak_mb = measure(func, wavenumbers, spectra,
+                                           repeat if n_spectra * n_points <= 1e6 else 1)
+                rec = {"case": name, "n_spectra": n_spectra, "n_points": n_points,
+                       "seconds": seconds, "peak_mb": peak_mb,
+                       "spectra_per_s": n_spectra / seconds if seconds > 0 else None}
+                results.append(rec)
+                if seconds > max_seconds:
+                    too_slow[name] = n_spectra * n_points
+                ref = REFERENCES.get(name)
+                if ref in cases and n_spectra * n_points <= MAX_CHECK_CELLS:
+                    # 结果与参考项目的最大差异 (相对于参考结果的最大绝对值)
+                    expected = cases[ref](wavenumbers, spectra)
+                    diff = np.abs(func(wavenumbers, spectra) - expected).max()
+                    rec["max_rel_diff"] = float(diff / (np.abs(expected).max() or 1))
+                if verbose:
+                    rate = rec["spectra_per_s"]
+                    rate = f"{rate:12.1f}" if rate is not None else f"{'-':>12s}"
+                    extra = (f"  与{ref}相差 {rec['max_rel_diff']:.2%}"
+                             if "max_rel_diff" in rec else "")
+                    print(f"{name:>12s} {n_spectra:>6d}×{n_points:<6d} "
+                          f"{seconds * 1e3:10.2f} ms {peak_mb:9.1f} MB {rate} 条/秒{extra}")
+    return results
+
+
+def _environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {"timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": commit, "python": platform.python_version(),
+            "numpy": np.__version__, "machine": platform.machine(),
+            "processor": platform.processor(), "cpu_count": os.cpu_count()}
+
+
+def append_history(path, results):
+    """将本次结果追加到JSON历史文件"""
+    history = []
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            history = json.load(f)
+    history.append({"environment": _environment(), "results": results})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(history, f, ensure_ascii=False, indent=1, allow_nan=False)
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    与基准结果比较，返回耗时超过基准 (1 + threshold) 倍的记录列表
+    [(记录, 基准耗时), ...]
+    """
+    ref = {(r["case"], r["n_spectra"], r["n_points"]): r["seconds"]
+           for r in baseline}
+    regressions = []
+    for r in results:
+        base = ref.get((r["case"], r["n_spectra"], r["n_points"]))
+        if base is not None and r["seconds"] > base * (1 + threshold):
+            regressions.append((r, base))
+    return regressions
+
+
+def _ints(text):
+    return tuple(int(v) for v in text.split(","))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="预处理函数性能基准")
+    parser.add_argument("--full", action="store_true",
+                        help="使用完整网格 (10~50000条 × 500~16000点)")
+    parser.add_argument("--cases", help="逗号分隔的项目名称，默认全部")
+    parser.add_argument("--spectra", type=_ints, help="逗号分隔的光谱条数")
+    parser.add_argument("--points", type=_ints, help="逗号分隔的数据点数")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-seconds", type=float, default=30.0)
+    parser.add_argument("--max-cells", type=float,
+                        help="单个数据矩阵元素个数上限，默认不限制")
+    parser.add_argument("--history", default="benchmark_history.json")
+    parser.add_argument("--baseline", default="benchmark_baseline.json")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="将本次结果保存为基准")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="耗时超过基准的比例阈值，超过则判为变慢")
+    args = parser.parse_args(argv)
+
+    spectra = args.spectra or (FULL_SPECTRA if args.full else QUICK_SPECTRA)
+    points = args.points or (FULL_POINTS if args.full else QUICK_POINTS)
+    results = run(args.cases.split(",") if args.cases else None, spectra,
+                  points, args.repeat, args.max_seconds, args.max_cells)
+    append_history(args.history, results)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=1, allow_nan=False)
+        print(f"基准已保存到 {args.baseline}")
+        return 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for r, base in regressions:
+            print(f"变慢: {r['case']} {r['n_spectra']}×{r['n_points']} "
+                  f"{base * 1e3:.2f} ms -> {r['seconds'] * 1e3:.2f} ms")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+处理结果导出
+
+支持批量写出的分隔文本，以及紧凑的二进制格式 (.npy/.npz/.parquet)。
+结果写入内存缓冲区，可直接交给 st.download_button，不再写到服务器的工作目录。
+"""
+import io
+import json
+
+import numpy as np
+
+# 格式 -> (文件扩展名, MIME类型)
+FORMATS = {
+    "txt": (".txt", "text/plain"),
+    "npy": (".npy", "application/octet-stream"),
+    "npz": (".npz", "application/octet-stream"),
+    "parquet": (".parquet", "application/octet-stream"),
+}
+
+
+def _recipe_json(recipe):
+    return json.dumps(recipe or [], ensure_ascii=False, default=repr)
+
+
+def write_text(buf, y, wavenumbers=None, recipe=None, label=None,
+               float_format="%.6g", delimiter="\t", include_wavenumbers=False):
+    """
+    写出分隔文本，每行对应一个波数位置、每列一条光谱 (与上传的数据格式相同)
+
+    处理流程和配方以 "#" 注释行写在文件开头，loader.load_spectra 读取时会自动跳过。
+    include_wavenumbers 为True时第一列为波数。
+    """
+    data = np.asarray(y).T
+    if include_wavenumbers:
+        if wavenumbers is None:
+            raise ValueError("include_wavenumbers需要提供波数")
+        data = np.column_stack([wavenumbers, data])
+    header = []
+    if label:
+        header.append(f"处理流程: {label}")
+    if recipe is not None:
+        header.append(f"recipe: {_recipe_json(recipe)}")
+    np.savetxt(buf, data, fmt=float_format, delimiter=delimiter,
+               header="\n".join(header), comments="# ", encoding="utf-8")
+
+
+def write_npz(buf, y, wavenumbers=None, recipe=None, label=None,
+              compress=False):
+    """
+    写出 .npz：spectra (n_spectra, n_points)、wavenumbers、
+    recipe (JSON字符串) 和 process_method (处理流程说明)
+    """
+    arrays = {"spectra": np.asarray(y),
+              "recipe": np.array(_recipe_json(recipe)),
+              "process_method": np.array(label or "")}
+    if wavenumbers is not None:
+        arrays["wavenumbers"] = np.asarray(wavenumbers)
+    (np.savez_compressed if compress else np.savez)(buf, **arrays)
+
+
+def write_parquet(buf, y, wavenumbers=None, recipe=None, label=None):
+    """
+    写出 Parquet：每行一条光谱，"spectrum" 列为定长列表，"spectrum_id" 为光谱序号；
+    波数、配方和处理流程保存在文件的 schema 元数据中
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("导出Parquet需要安装pyarrow") from None
+    y = np.ascontiguousarray(y)
+    spectra = pa.FixedSizeListArray.from_arrays(pa.array(y.ravel()), y.shape[1])
+    table = pa.table({"spectrum_id": pa.array(np.arange(len(y))),
+                      "spectrum": spectra})
+    meta = {"recipe": _recipe_json(recipe), "process_method": label or ""}
+    if wavenumbers is not None:
+        meta["wavenumbers"] = json.dumps(np.asarray(wavenumbers).tolist())
+    table = table.replace_schema_metadata(meta)
+    pq.write_table(table, buf)
+
+
+def write(f, y, wavenumbers=None, fmt="txt", recipe=None, label=None,
+          **kwargs):
+    """
+    将处理结果写入二进制文件对象
+
+    参数:
+        f: 以二进制方式打开的文件对象或 io.BytesIO
+        y: 处理后的光谱 (n_spectra, n_points)
+        wavenumbers: 拉曼位移一维数组
+        fmt: "txt"、"npy"、"npz" 或 "parquet" (.npy 只保存光谱矩阵本身)
+        recipe: 处理配方 (Pipeline.to_recipe())
+        label: 处理流程说明
+        **kwargs: 各格式的附加参数，如 txt 的 float_format/delimiter
+    """
+    if fmt == "txt":
+        write_text(f, y, wavenumbers, recipe, label, **kwargs)
+    elif fmt == "npy":
+        np.save(f, np.asarray(y))
+    elif fmt == "npz":
+        write_npz(f, y, wavenumbers, recipe, label, **kwargs)
+    elif fmt == "parquet":
+        write_parquet(f, y, wavenumbers, recipe, label)
+    else:
+        raise ValueError(f"未知的导出格式: {fmt}")
+
+
+def export_bytes(y, wavenumbers=None, fmt="txt", recipe=None, label=None,
+                 **kwargs):
+    """导出到内存缓冲区，返回已定位到开头的 io.BytesIO，参数见 write"""
+    buf = io.BytesIO()
+    write(buf, y, wavenumbers, fmt, recipe, label, **kwargs)
+    buf.seek(0)
+    return buf
+
+
+def export_file(path, y, wavenumbers=None, fmt=None, recipe=None, label=None,
+                **kwargs):
+    """导出到文件，fmt 默认按扩展名判断"""
+    if fmt is None:
+        ext = str(path).rsplit(".", 1)[-1].lower()
+        fmt = ext if ext in FORMATS else "txt"
+    with open(path, "wb") as f:
+        write(f, y, wavenumbers, fmt, recipe, label, **kwargs)
@@ -1,24 +1,93 @@
+from functools import lru_cache
+
 import numpy as np
-import copy
-from scipy.fftpack import fft, ifft
+from scipy.fft import rfft, irfft
+
+from precision import working
 
 
 """__________________________________________
     信号进行傅里叶变换，使高频信号的系数为零，再进行傅里叶逆变换
     转换会时域上的信号便是滤波后的效果。
 """
+
+
+@lru_cache(maxsize=32)
+def _lowpass_gain(n, cutoff, window, width):
+    """
+    rfft频点上的低通增益 (按 (长度, 截止频点, 窗函数, 过渡带宽) 缓存)
+
+    window:
+        "boxcar": 截止频点以下保留、以上置零，恰好落在截止频点上的取半权重
+                  (与原 Smfft 只保留负频率一侧该频点的效果相同)
+        "hann": 以截止频点为中心、宽度为width个频点的升余弦过渡带
+        "gaussian": 高斯衰减，在截止频点处增益为0.5
+    """
+    k = np.arange(n // 2 + 1, dtype=np.float64)
+    if window == "boxcar":
+        if cutoff >= n / 2:
+            gain = np.ones_like(k)
+        else:
+            gain = (k < cutoff) + 0.5 * (k == cutoff)
+    elif window == "hann":
+        if width is None:
+            width = max(2.0, cutoff / 5)
+        t = np.clip((k - (cutoff - width / 2)) / width, 0, 1)
+        gain = 0.5 * (1 + np.cos(np.pi * t))
+    elif window == "gaussian":
+        sigma = cutoff / np.sqrt(2 * np.log(2))
+        gain = np.exp(-0.5 * (k / sigma) ** 2)
+    else:
+        raise ValueError(f"未知的窗函数: {window}")
+    gain.flags.writeable = False
+    return gain
+
+
+def resolution_to_cutoff(n, wavenumbers, resolution):
+    """
+    将物理分辨率 (cm^-1) 换算为截止频点
+
+    频点k对应的频率为 k / (n * d) (d为波数间隔)，宽度为resolution的谱带
+    对应频率 1 / resolution，因此截止频点为 n * d / resolution。
+    """
+    wavenumbers = np.asarray(wavenumbers, dtype=np.float64)
+    d = abs(wavenumbers[-1] - wavenumbers[0]) / (len(wavenumbers) - 1)
+    return n * d / resolution
+
+
+def lowpass(arr, cutoff=None, resolution=None, wavenumbers=None,
+            window="boxcar", width=None, axis=-1, workers=None):
+    """
+    基于实数FFT的批量低通滤波，适用于任意光谱长度
+
+    参数:
+        arr: 输入光谱 (n_samples, n_points)
+        cutoff: 截止频点 (保留的低频系数个数)
+        resolution: 以物理分辨率(cm^-1)指定截止，需同时给出wavenumbers
+        wavenumbers: 拉曼位移(cm^-1)的一维数组
+        window: 过渡带形状，"boxcar"/"hann"/"gaussian"
+        width: "hann" 窗的过渡带宽度 (频点数)
+        axis: 滤波方向，默认沿点轴
+        workers: scipy.fft 的并行线程数
+
+    返回:
+        滤波后的光谱，形状与arr相同，dtype按精度策略
+    """
+    x = working(arr)
+    n = x.shape[axis]
+    if cutoff is None:
+        if resolution is None or wavenumbers is None:
+            raise ValueError("需指定cutoff，或同时指定resolution和wavenumbers")
+        cutoff = resolution_to_cutoff(n, wavenumbers, resolution)
+    gain = _lowpass_gain(n, float(cutoff), window,
+                         None if width is None else float(width))
+
+    spec = rfft(x, axis=axis, workers=workers)
+    shape = [1] * x.ndim
+    shape[axis] = gain.size
+    spec *= gain.reshape(shape)
+    return irfft(spec, n=n, axis=axis, workers=workers)
+
+
 def Smfft(arr, row_e = 51):
-    row = arr.shape[0]
-    col = arr.shape[1]
-    fftresult = np.zeros((row, col))
-    for i in range(row):
-        sfft = fft(arr[i])
-        row_s = 2000
-        #cutfun = np.ones([row_s, 1])
-        #cutfun[20:row_s-20] = 0
-        sfftn = copy.deepcopy(sfft)
-        sfftn[row_e:row_s-row_e] = 0
-        result = ifft(sfftn)
-        real_r = np.real(result)
-        fftresult[i] = real_r
-    return fftresult
+    return lowpass(arr, cutoff=row_e)
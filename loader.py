@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+光谱数据文件读取
+
+使用 numpy 的 C 语言文本解析器分块读取制表符/空格分隔的数据，自动识别矩阵形状。
+"""
+import io
+import os
+from contextlib import contextmanager
+from itertools import islice
+
+import numpy as np
+
+
+@contextmanager
+def _text_stream(source, encoding):
+    """将路径、二进制文件对象或文本文件对象统一为文本流 (不关闭调用方传入的文件对象)"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, encoding=encoding, errors='replace') as f:
+            yield f
+    elif isinstance(source, io.TextIOBase):
+        yield source
+    else:
+        f = io.TextIOWrapper(source, encoding=encoding, errors='replace')
+        try:
+            yield f
+        finally:
+            f.detach()
+
+
+def _rereadable(source):
+    """文件路径或可 seek 的二进制文件对象可以先统计行数再读取"""
+    if isinstance(source, (str, os.PathLike)):
+        return True
+    return not isinstance(source, io.TextIOBase) and source.seekable()
+
+
+def count_rows(source, comments='#', skiprows=0, encoding='utf-8'):
+    """
+    统计数据行数 (不含注释行和空行)，只逐行检查而不解析数值
+
+    source 需可重复读取 (文件路径或可 seek 的文件对象)，读取后恢复原位置。
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        pos = source.tell()
+    n = 0
+    with _text_stream(source, encoding) as f:
+        for line in islice(f, skiprows, None):
+            line = line.split(comments, 1)[0] if comments else line
+            if line.strip():
+                n += 1
+    if not isinstance(source, (str, os.PathLike)):
+        source.seek(pos)
+    return n
+
+
+def iter_chunks(source, chunk_rows=1024, delimiter=None, comments='#',
+                skiprows=0, encoding='utf-8'):
+    """
+    分块读取文本数据
+
+    参数:
+        source: 文件路径或文件对象 (如 Streamlit 上传的文件)
+        chunk_rows: 每块读取的行数
+        delimiter: 分隔符，默认任意空白字符
+        comments: 注释符，注释行和空行会被跳过
+        skiprows: 跳过开头的行数
+        encoding: 文本编码
+
+    返回:
+        逐块产生形状为 (行数, 列数) 的 float64 数组，各块列数相同
+    """
+    ncols = None
+    with _text_stream(source, encoding) as f:
+        lines = iter(f)
+        for _ in islice(lines, skiprows):
+            pass
+        while True:
+            block = list(islice(lines, chunk_rows))
+            if not block:
+                break
+            arr = np.loadtxt(block, delimiter=delimiter, comments=comments,
+                             dtype=np.float64, ndmin=2)
+            if arr.size == 0:
+                continue
+            if ncols is None:
+                ncols = arr.shape[1]
+            elif arr.shape[1] != ncols:
+                raise ValueError(f"数据列数不一致: 应为{ncols}列，实际为{arr.shape[1]}列")
+            yield arr
+
+
+def load_spectra(source, layout="columns", chunk_rows=1024, delimiter=None,
+                 comments='#', skiprows=0, encoding='utf-8', dtype=np.float64):
+    """
+    读取光谱数据文件，自动识别光谱条数和数据点数
+
+    参数:
+        source: 文件路径或文件对象
+        layout: "columns" 表示每列一条光谱、每行对应同一波数位置；
+                "rows" 表示每行一条光谱
+        dtype: 结果的dtype，如 np.float32 可使内存占用减半
+        其余参数见 iter_chunks
+
+    返回:
+        光谱矩阵 (n_spectra, n_points)
+    """
+    if layout not in ("columns", "rows"):
+        raise ValueError(f"未知的数据排列方式: {layout}")
+    nrows = (count_rows(source, comments, skiprows, encoding)
+             if _rereadable(source) else None)
+    chunks = iter_chunks(source, chunk_rows, delimiter, comments, skiprows,
+                         encoding)
+
+    if nrows is None:
+        # 无法预知行数：先收集各块再拼接
+        blocks = list(chunks)
+        if not blocks:
+            raise ValueError("文件中没有数据")
+        data = np.concatenate(blocks).astype(dtype, copy=False)
+        return np.ascontiguousarray(data.T) if layout == "columns" else data
+
+    # 按数据行数预分配，各块直接写入结果，峰值内存约为一份数据
+    out = None
+    filled = 0
+    for arr in chunks:
+        n = arr.shape[0]
+        if filled + n > nrows:
+            raise ValueError("数据行数与统计的行数不一致")
+        if layout == "columns":
+            if out is None:
+                out = np.empty((arr.shape[1], nrows), dtype=dtype)
+            out[:, filled:filled + n] = arr.T
+        else:
+            if out is None:
+                out = np.empty((nrows, arr.shape[1]), dtype=dtype)
+            out[filled:filled + n] = arr
+        filled += n
+    if out is None:
+        raise ValueError("文件中没有数据")
+    if filled != nrows:
+        raise ValueError("数据行数与统计的行数不一致")
+    return out
+
+
+def load_wavenumbers(source, comments='#', encoding='utf-8'):
+    """读取波数文件 (每行一个波数值)，返回一维数组"""
+    with _text_stream(source, encoding) as f:
+        return np.loadtxt(f, comments=comments, dtype=np.float64).ravel()
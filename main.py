@@ -1,15 +1,15 @@
+import json
+import os
 import streamlit as st
 import numpy as np
 import pandas as pd
-from SD import D2
-from FD import D1
-from sigmoids import sigmoid
-from squashing import squashing  
-from i_squashing import i_squashing 
-from i_sigmoid import i_sigmoid
-from IModPoly import IModPoly
-from AsLS import baseline_als
-from LPnorm import LPnorm
+from loader import load_spectra, load_wavenumbers
+from pipeline import Pipeline
+from plotdata import chart_frame
+from export import FORMATS, export_bytes
+from stagecache import StageCache, bytes_digest, stage_key
+from profiling import Profiler
+from registry import STAGES, STAGE_UI, methods
 
 # 设置页面
 st.set_page_config(layout="wide", page_title="光谱预处理系统")
@@ -23,18 +23,46 @@ if 'processed_data' not in st.session_state:
 if 'peaks' not in st.session_state:
     st.session_state.peaks = None
 
-# 文件读取函数 (从您原有代码提取)
-def getfromone(path, lines, much):
-    numb = re.compile(r"-?\d+(?:\.\d+)?")
-    ret = np.zeros((lines, much), dtype=float)
-    with open(path) as f:
-        con = 0
-        for line in f:
-            li = numb.findall(line)
-            for i in range(lines):
-                ret[i][con] = float(li[i])
-            con += 1
-    return ret
+@st.cache_resource
+def get_stage_cache():
+    """各会话共享的处理结果缓存，重复上传和调整基线以外的参数时复用已有结果"""
+    return StageCache()
+
+
+cache = get_stage_cache()
+
+
+def cached_load(uploaded, loader):
+    """按文件内容哈希缓存解析结果"""
+    key = stage_key(bytes_digest(uploaded.getvalue()), loader.__name__)
+    data = cache.get(key)
+    if data is None:
+        uploaded.seek(0)
+        data = cache.put(key, loader(uploaded))
+    return data
+
+
+def param_widgets(spec):
+    """按注册表中的参数说明生成控件，返回参数字典"""
+    params = {}
+    for prm in spec.params:
+        if prm.widget == "slider":
+            params[prm.name] = st.slider(prm.label, prm.min, prm.max, prm.default, prm.step,
+                                         key=prm.key, help=prm.help)
+        elif prm.widget == "number":
+            params[prm.name] = st.number_input(prm.label, value=prm.default, format=prm.format,
+                                               key=prm.key, help=prm.help)
+        elif prm.widget == "checkbox":
+            params[prm.name] = st.checkbox(prm.label, prm.default, key=prm.key, help=prm.help)
+        elif prm.widget == "select":
+            params[prm.name] = st.selectbox(prm.label, prm.options,
+                                            prm.options.index(prm.default),
+                                            key=prm.key, help=prm.help)
+        else:
+            params[prm.name] = prm.default
+    if spec.info:
+        st.info(spec.info)
+    return params
 
 # 创建两列布局
 col1, col2 = st.columns([1.2, 3])
@@ -48,19 +76,18 @@ with col1:
         # 光谱数据上传
         uploaded_file = st.file_uploader("上传光谱数据文件", type=['txt'])
         
-        # 参数设置
-        lines = st.number_input("光谱条数", min_value=1, value=1)
-        much = st.number_input("每条光谱数据点数", min_value=1, value=2000)
-
         if uploaded_file and wavenumber_file:
             try:
                 # 读取波数数据
-                wavenumbers = np.loadtxt(wavenumber_file).ravel()
+                wavenumbers = cached_load(wavenumber_file, load_wavenumbers)
                 
-                # 读取光谱数据
-                ret = getfromone(uploaded_file, lines, much)
+                # 读取光谱数据 (自动识别光谱条数和数据点数)
+                ret = cached_load(uploaded_file, load_spectra)
+                lines, much = ret.shape
+                if much != len(wavenumbers):
+                    raise ValueError(f"光谱数据点数({much})与波数个数({len(wavenumbers)})不一致")
                 
-                st.session_state.raw_data = (wavenumbers, ret.T)  # 转置为(点数, 光谱数)
+                st.session_state.raw_data = (wavenumbers, ret)  # (光谱数, 点数)
                 st.success(f"数据加载成功！{lines}条光谱，每条{much}个点")
                 
             except Exception as e:
@@ -68,46 +95,28 @@ with col1:
 
     # ===== 预处理设置 =====
     with st.expander("⚙️ 预处理设置", expanded=True):
-        # 基线校准
-        st.subheader("基线校准")
-        baseline_method = st.selectbox(
-            "基线校准方法",
-            ["无", "SD", "FD", "I-ModPoly", "AsLS"],
-            key="baseline_method"
-        )
-
-        # 动态参数
-        if baseline_method == "I-ModPoly":
-            polyorder = st.slider("多项式阶数", 3, 10, 6, key="polyorder")
-        elif baseline_method == "AsLS":
-            lam = st.number_input("λ(平滑度)", value=1e7, format="%e", key="lam")
-            p = st.slider("p(不对称性)", 0.01, 0.5, 0.1, key="p")
-
-        # ===== 数据变换 =====
-        st.subheader("🧩 数据。。测试变换")
-        transform_method = st.selectbox(
-            "变换方法",
-            ["无", "挤压函数(归一化版)", "挤压函数(原始版)", 
-             "Sigmoid(归一化版)", "Sigmoid(原始版)"],
-            key="transform_method",
-            help="选择要应用的数据变换方法"
-        )
-
-        # 动态参数
-        if "Sigmoid(归一化版)" in transform_method:
-            maxn = st.slider("归一化系数", 1, 20, 10, 
-                           help="控制归一化程度，值越大归一化效果越强")
-        
-        if "挤压函数(归一化版)" in transform_method:
-            st.info("此方法会自动对数据进行归一化处理")
+        # 各步骤的方法下拉框和参数控件由 registry 生成
+        selected = []
+        for stage in STAGES:
+            subheader, title, key = STAGE_UI[stage]
+            st.subheader(subheader)
+            specs = {spec.title: spec for spec in methods(stage)}
+            choice = st.selectbox(title, ["无", *specs], key=key)
+            if choice != "无":
+                spec = specs[choice]
+                selected.append((spec, param_widgets(spec)))
 
-        # 归一化
-        st.subheader("归一化")
-        norm_method = st.selectbox(
-            "归一化方法",
-            ["无", "无穷大范数", "L10范数", "L4范数"],
-            key="norm_method"
-        )
+        precision_labels = {"保持输入精度": "preserve", "float32 (内存减半)": "float32",
+                            "float64": "float64"}
+        precision_label = st.selectbox("计算精度", list(precision_labels), key="precision",
+                                       help="float32 适合平滑、变换和归一化，可使内存占用减半；"
+                                            "基线校准的最小二乘求解始终在 float64 下进行")
+
+        workers = st.number_input("并行进程数", 1, os.cpu_count() or 1, 1, key="workers",
+                                  help="按光谱分块在多个进程中并行处理；光谱条数较少时自动串行")
+
+        profile_enabled = st.checkbox("记录各步骤耗时", key="profile_enabled",
+                                      help="记录每个步骤的耗时、CPU时间、峰值内存和迭代次数 (会略微变慢)")
 
         # 处理按钮
         if st.button("🚀 应用处理", type="primary", use_container_width=True):
@@ -115,62 +124,73 @@ with col1:
                 st.warning("请先上传数据文件")
             else:
                 wavenumbers, y = st.session_state.raw_data
-                y_processed = y.copy()
-                method_name = []
-
-                # 基线处理
-                if baseline_method == "SD":
-                    y_processed = D2(y_processed)
-                    method_name.append("SD基线校准")
-                elif baseline_method == "FD":
-                    y_processed = D1(y_processed)
-                    method_name.append("FD基线校准")
-                elif baseline_method == "I-ModPoly":
-                    y_processed = IModPoly(wavenumbers, y_processed, polyorder)
-                    method_name.append(f"I-ModPoly(阶数={polyorder})")
-                elif baseline_method == "AsLS":
-                    y_processed = baseline_als(y_processed, lam, p, 10)
-                    method_name.append(f"AsLS(λ={lam:.1e},p={p})")
-
-                # 数据变换处理
-                if transform_method == "挤压函数(归一化版)":
-                    y_processed = i_squashing(y_processed)
-                    method_name.append("i_squashing")
-                elif transform_method == "挤压函数(原始版)":
-                    y_processed = squashing(y_processed)
-                    method_name.append("squashing")
-                elif transform_method == "Sigmoid(归一化版)":
-                    y_processed = i_sigmoid(y_processed, maxn)
-                    method_name.append(f"i_sigmoid(maxn={maxn})")
-                elif transform_method == "Sigmoid(原始版)":
-                    y_processed = sigmoid(y_processed)
-                    method_name.append("sigmoid")
-
-                # 归一化处理
-                if norm_method == "无穷大范数":
-                    y_processed = LPnorm(y_processed, np.inf)
-                    method_name.append("无穷大范数")
-                elif norm_method == "L10范数":
-                    y_processed = LPnorm(y_processed, 10)
-                    method_name.append("L10范数")
-                elif norm_method == "L4范数":
-                    y_processed = LPnorm(y_processed, 4)
-                    method_name.append("L4范数")
+                recipe = [{"method": spec.name, "params": params} for spec, params in selected]
+
+                pipeline = Pipeline.from_recipe(recipe)
+                profiler = Profiler() if profile_enabled else None
+                y_processed = pipeline.run(y, wavenumbers, cache=cache, profiler=profiler,
+                                           precision=precision_labels[precision_label],
+                                           workers=workers, checkpoints=("baseline",))
 
                 st.session_state.processed_data = (wavenumbers, y_processed)
-                st.session_state.process_method = " → ".join(method_name)
+                st.session_state.process_method = pipeline.label
+                st.session_state.recipe = pipeline.to_recipe()
+                st.session_state.export_data = None
+                st.session_state.peaks = None
+                st.session_state.profile = profiler.to_frame() if profiler else None
                 st.success(f"处理完成: {st.session_state.process_method}")
 
+    # ===== 基线参数扫描 =====
+    with st.expander("🎯 基线参数扫描", expanded=False):
+        sweep_method = st.radio("扫描方法", ["AsLS", "I-ModPoly"], horizontal=True, key="sweep_method")
+        if sweep_method == "AsLS":
+            sweep_lam = st.slider("log10(λ) 范围", 2.0, 12.0, (4.0, 9.0), 0.5, key="sweep_lam")
+            sweep_nlam = st.slider("λ 取值个数", 2, 12, 6, key="sweep_nlam")
+            sweep_p = st.multiselect("p 取值", [0.001, 0.005, 0.01, 0.05, 0.1, 0.2, 0.5],
+                                     [0.01, 0.05, 0.1], key="sweep_p")
+        else:
+            sweep_orders = st.slider("多项式阶数范围", 1, 15, (3, 10), key="sweep_orders")
+        sweep_n = st.slider("抽样光谱条数", 5, 500, 50, key="sweep_n")
+        st.caption("roughness 越大说明基线跟随峰形 (过拟合)，negative_fraction 越大说明基线高于信号 (欠拟合)")
+
+        if st.button("开始扫描", use_container_width=True):
+            if st.session_state.raw_data is None:
+                st.warning("请先上传数据文件")
+            else:
+                from sweep import sweep_asls, sweep_imodpoly
+                wavenumbers, y = st.session_state.raw_data
+                with st.spinner("正在扫描参数..."):
+                    if sweep_method == "AsLS":
+                        st.session_state.sweep = sweep_asls(
+                            y, np.logspace(*sweep_lam, sweep_nlam), sweep_p or [0.1],
+                            n_sample=sweep_n, workers=workers,
+                            warm_start=st.session_state.get('warm_start', False))
+                    else:
+                        st.session_state.sweep = sweep_imodpoly(
+                            y, wavenumbers, range(sweep_orders[0], sweep_orders[1] + 1),
+                            n_sample=sweep_n, workers=workers)
+
+        if st.session_state.get('sweep') is not None:
+            st.dataframe(st.session_state.sweep, hide_index=True, use_container_width=True,
+                         column_config={"lam": st.column_config.NumberColumn(format="%.1e")})
+
 with col2:
     # ===== 系统信息 =====
     if st.session_state.get('raw_data'):
         wavenumbers, y = st.session_state.raw_data
         cols = st.columns([1, 2])
         with cols[0]:
-            st.info(f"📊 数据维度: {y.shape[1]}条光谱 × {y.shape[0]}点")
+            st.info(f"📊 数据维度: {y.shape[0]}条光谱 × {y.shape[1]}点")
         with cols[1]:
             if st.session_state.get('process_method'):
                 st.success(f"🛠️ 处理流程: {st.session_state.process_method}")
+            profile = st.session_state.get('profile')
+            if profile is not None and len(profile):
+                with st.expander("⏱️ 各步骤耗时", expanded=True):
+                    st.bar_chart(profile, x="步骤", y="耗时(ms)")
+                    st.dataframe(profile, hide_index=True, use_container_width=True)
+                    if profile["并行"].any():
+                        st.caption("并行执行的步骤只记录耗时，工作进程的CPU时间和峰值内存无法在主进程中测得，已留空")
     
     st.divider()
     
@@ -178,30 +198,109 @@ with col2:
     st.subheader("📈 光谱可视化")
     if st.session_state.get('raw_data'):
         wavenumbers, y = st.session_state.raw_data
-        chart_data = pd.DataFrame(y, index=wavenumbers)
-        
+        datasets = {"原始数据": y}
         if st.session_state.get('processed_data'):
-            _, y_processed = st.session_state.processed_data
-            chart_data = pd.DataFrame({
-                "原始数据": y.mean(axis=1),
-                "处理后数据": y_processed.mean(axis=1)
-            }, index=wavenumbers)
-        
-        st.line_chart(chart_data)
+            datasets["处理后数据"] = st.session_state.processed_data[1]
+
+        view_cols = st.columns(3)
+        with view_cols[0]:
+            view = st.selectbox("显示方式", ["均值", "分位带", "抽样光谱"], key="plot_view")
+        with view_cols[1]:
+            n_sample = st.slider("抽样条数", 1, 50, 10, key="plot_n_sample",
+                                 disabled=(view != "抽样光谱"))
+        with view_cols[2]:
+            plot_width = st.number_input("每条曲线显示点数", min_value=100,
+                                         max_value=10000, value=1000, step=100,
+                                         key="plot_width")
+        wn_min, wn_max = float(np.min(wavenumbers)), float(np.max(wavenumbers))
+        x_range = st.slider("波数范围", wn_min, wn_max, (wn_min, wn_max),
+                            key="plot_range")
+
+        # 只有抽稀后的数据发送到浏览器，绘图耗时与光谱条数无关
+        view_key = {"均值": "mean", "分位带": "bands", "抽样光谱": "sample"}[view]
+        chart_data = pd.concat([
+            chart_frame(wavenumbers, data, view_key, width=plot_width,
+                        x_range=x_range, n_sample=n_sample, name=name)
+            for name, data in datasets.items()
+        ])
+        st.line_chart(chart_data, x="波数", y="强度", color="曲线")
     else:
         st.info("请先上传并处理数据")
 
+    # ===== 峰检测 =====
+    if st.session_state.get('processed_data'):
+        st.subheader("🔍 峰检测")
+        peak_cols = st.columns(4)
+        with peak_cols[0]:
+            peak_prominence = st.number_input("最小突出度", 0.0, value=0.0, format="%g",
+                                              key="peak_prominence")
+        with peak_cols[1]:
+            peak_height = st.number_input("最小峰高", value=None, format="%g",
+                                          key="peak_height", placeholder="不限")
+        with peak_cols[2]:
+            peak_width = st.slider("峰宽范围 (cm⁻¹)", 0.0, 200.0, (0.0, 200.0),
+                                   key="peak_width",
+                                   help="滑块位于端点时该侧不限制 (右端200表示不限上限，保留宽峰)")
+        with peak_cols[3]:
+            st.write("")
+            if st.button("检测峰", use_container_width=True):
+                from peaks import find_peaks
+                wavenumbers, y_processed = st.session_state.processed_data
+                # 滑块位于端点时该侧不限制，宽于200 cm⁻¹ 的峰 (如O-H伸缩) 不会被默认范围滤掉
+                width_lo, width_hi = peak_width
+                st.session_state.peaks = find_peaks(
+                    y_processed, wavenumbers, height=peak_height,
+                    prominence=peak_prominence or None,
+                    width=(width_lo or None, None if width_hi >= 200.0 else width_hi))
+
+        peak_table = st.session_state.get('peaks')
+        if peak_table is not None:
+            st.caption(f"共检测到 {len(peak_table)} 个峰 ({peak_table.n_spectra} 条光谱)")
+            query_cols = st.columns(2)
+            with query_cols[0]:
+                peak_center = st.number_input("查询波数 (cm⁻¹)", value=1003.0, key="peak_center")
+            with query_cols[1]:
+                peak_tol = st.number_input("容差 (cm⁻¹)", 0.1, value=5.0, key="peak_tol")
+            hits = peak_table.near(peak_center, peak_tol)
+            st.write(f"{len(np.unique(hits.spectrum))} 条光谱在 {peak_center:g}±{peak_tol:g} cm⁻¹ 内有峰")
+            st.dataframe(hits.to_frame().rename(columns={
+                "spectrum": "光谱序号", "position": "峰位", "height": "峰高",
+                "prominence": "突出度", "width": "峰宽"}),
+                hide_index=True, use_container_width=True)
+
     # ===== 结果导出 =====
     if st.session_state.get('processed_data'):
         st.subheader("💾 结果导出")
-        export_name = st.text_input("导出文件名", "processed_spectra.txt")
-        
-        if st.button("导出处理结果", type="secondary"):
+        export_cols = st.columns([2, 1, 1])
+        with export_cols[0]:
+            export_name = st.text_input("导出文件名", "processed_spectra")
+        with export_cols[1]:
+            export_fmt = st.selectbox("导出格式", list(FORMATS), key="export_fmt")
+        with export_cols[2]:
+            float_format = st.text_input("数值格式", "%.6g", key="float_format",
+                                         disabled=(export_fmt != "txt"))
+
+        if st.button("生成导出文件", type="secondary"):
             wavenumbers, y_processed = st.session_state.processed_data
-            with open(export_name, "w") as f:
-                for line in y_processed.T:  # 转置回原始格式
-                    f.write("\t".join(map(str, line)) + "\n")
-            st.success(f"结果已导出到 {export_name}")
+            kwargs = {"float_format": float_format} if export_fmt == "txt" else {}
+            buf = export_bytes(y_processed, wavenumbers, export_fmt,
+                               recipe=st.session_state.get('recipe'),
+                               label=st.session_state.get('process_method'),
+                               **kwargs)
+            st.session_state.export_data = (export_fmt, buf.getvalue())
+
+        # 导出内容保存在内存中，由浏览器下载，不写入服务器工作目录
+        if st.session_state.get('export_data'):
+            fmt, data = st.session_state.export_data
+            ext, mime = FORMATS[fmt]
+            file_name = export_name if export_name.endswith(ext) else export_name + ext
+            st.download_button("⬇️ 下载处理结果", data, file_name=file_name, mime=mime)
+
+        # 处理配方可交给 batch.py 对整批文件做相同的处理
+        if st.session_state.get('recipe') is not None:
+            st.download_button("⬇️ 下载处理配方", json.dumps(st.session_state.recipe, ensure_ascii=False, indent=1),
+                               file_name="recipe.json", mime="application/json",
+                               help="用于命令行批量处理: python batch.py recipe.json \"data/*.txt\" out/")
 
 # 使用说明
 with st.expander("ℹ️ 使用指南", expanded=False):
@@ -209,10 +308,10 @@ with st.expander("ℹ️ 使用指南", expanded=False):
     **标准操作流程:**
     1. 上传波数文件（单列文本）
     2. 上传光谱数据文件（多列文本）
-    3. 设置光谱条数和数据点数
+    3. 系统自动识别光谱条数和数据点数
     4. 选择预处理方法
     5. 点击"应用处理"
-    6. 导出结果
+    6. 导出结果；下载的处理配方可用 `python batch.py recipe.json "data/*.txt" out/` 批量处理整个目录
 
     **文件格式要求:**
     - 波数文件: 每行一个波数值
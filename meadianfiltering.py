@@ -5,23 +5,69 @@ Created on Sat Sep 14 23:25:01 2019
 @author: Administrator
 """
 import numpy as np
-import scipy.signal as signal
+from scipy import ndimage
 
+from precision import result_dtype, working
 
-def MWM(arr, n=7, it=1):
-    row = arr.shape[0]
-    col = arr.shape[1]
-    median = np.zeros((row, col))
+
+def median_smooth(arr, n, axis=-1, kernel="running", out=None):
+    """
+    沿指定轴对整个矩阵做中值滤波，边缘按0填充 (与 scipy.signal.medfilt 一致)
+
+    参数:
+        arr: 输入光谱 (n_samples, n_points)
+        n: 窗口宽度 (奇数)
+        axis: 滤波方向，默认沿点轴
+        kernel: "running" 将所有光谱以n//2个0隔开拼成一维序列，一次调用滑动中值
+                (scipy>=1.14 为基于堆的 O(log n) 更新，适合大窗口)；
+                "sort" 使用 ndimage.median_filter 的通用N维实现
+        out: 可选的输出数组
+
+    返回:
+        滤波后的光谱
+    """
+    if n % 2 == 0:
+        raise ValueError("窗口宽度n必须为奇数")
+    a = np.moveaxis(working(arr), axis, -1)
+    if out is None:
+        out = np.empty(np.shape(arr), dtype=a.dtype)
+    res = np.moveaxis(out, axis, -1)
+
+    if kernel == "running":
+        col = a.shape[-1]
+        h = n // 2
+        buf = np.zeros(a.shape[:-1] + (col + h,), dtype=a.dtype)
+        buf[..., :col] = a
+        flat = ndimage.median_filter(buf.ravel(), size=n, mode='constant')
+        res[...] = flat.reshape(buf.shape)[..., :col]
+    elif kernel == "sort":
+        size = (1,) * (a.ndim - 1) + (n,)
+        ndimage.median_filter(a, size=size, mode='constant', output=res)
+    else:
+        raise ValueError(f"未知的中值滤波核: {kernel}")
+    return out
+
+
+def MWM(arr, n=7, it=1, kernel="running"):
+    """
+    滑动窗口中值滤波 (去除宇宙射线/尖峰)
+
+    参数:
+        arr: 输入光谱 (n_samples, n_points)
+        n: 窗口宽度 (奇数)
+        it: 滤波次数，第k次 (从0计) 使用的窗口宽度为 n - 2 * (it - 1 - k)
+        kernel: 中值滤波实现，见 median_smooth
+
+    返回:
+        滤波后的光谱，形状与arr相同，dtype按精度策略
+    """
+    median = np.array(working(arr))
     ns = []
     for _ in range(it):
         ns.append(n)
         n -= 2
-    for i in range(row):
-        median[i] = arr[i].copy()
-        nn = ns.copy()
-        for _ in range(it):
-            n = nn.pop()
-            if n > 1:
-                tmp = signal.medfilt(median[i], n)
-                median[i] = tmp
+    while ns:
+        n = ns.pop()
+        if n > 1:
+            median_smooth(median, n, kernel=kernel, out=median)
     return median
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+共享内存的多进程行块执行器
+
+各预处理函数对每条光谱独立计算，可将矩阵按行分块交给进程池并行处理。
+输入和输出矩阵放在 multiprocessing.shared_memory 中，工作进程直接读写，
+不对数据做序列化，进程间只传递共享内存名称和行号范围。
+光谱条数较少或进程数为1时直接在当前进程中计算，避免额外的调度延迟。
+
+进程池使用 forkserver/spawn 方式启动，工作进程会重新导入主模块，
+因此在脚本中调用时需放在 if __name__ == "__main__": 之下，否则工作进程在导入时
+退出，调用抛出 BrokenProcessPool。
+
+用法:
+    from parallel import row_map, rowwise
+    y = row_map(baseline_als, spectra, 1e7, 0.1, workers=8)
+    smooth = rowwise(MWM, workers=8)
+    y = smooth(spectra, 7)
+"""
+import atexit
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from functools import wraps
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from precision import get_policy, policy, result_dtype
+
+# 少于该条数时串行计算
+MIN_PARALLEL_ROWS = 64
+# 元素个数少于该值时串行计算 (进程调度的开销会超过并行的收益)
+MIN_PARALLEL_CELLS = 1 << 18
+# 每个进程平均分到的块数，块数多于进程数可平衡各块耗时的差异
+BLOCKS_PER_WORKER = 4
+
+_workers = 1
+_pool = None
+_pool_workers = 0
+_lock = threading.Lock()
+
+
+def resolve_workers(workers=None):
+    """workers 为None时使用 set_workers 的设置；0或负数表示使用全部CPU核"""
+    if workers is None:
+        workers = _workers
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def set_workers(workers):
+    """设置默认进程数 (1为串行，0为全部CPU核)"""
+    global _workers
+    _workers = int(workers)
+
+
+def _context():
+    # 服务进程 (如 Streamlit) 为多线程，不宜直接 fork
+    methods = mp.get_all_start_methods()
+    return mp.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _executor(workers):
+    """按进程数复用的进程池"""
+    global _pool, _pool_workers
+    # 工作进程正在导入主模块 (主模块没有 __main__ 保护)：不再创建嵌套的进程池
+    if getattr(mp.current_process(), "_inheriting", False):
+        raise RuntimeError('工作进程导入主模块时不能启动进程池，'
+                           '请将并行处理的调用放在 if __name__ == "__main__": 之下')
+    with _lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=_context())
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown():
+    """关闭进程池"""
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _broken(error):
+    """进程池损坏时丢弃 (下次调用时重新创建)，返回附带说明的异常"""
+    shutdown()
+    return BrokenProcessPool(f'{error}\n在脚本中调用时，'
+                             '需放在 if __name__ == "__main__": 之下')
+
+
+atexit.register(shutdown)
+
+
+def _work(func, src, dst, r0, r1, args, kwargs, precision):
+    """工作进程：计算 src[r0:r1] 并写入 dst[r0:r1]"""
+    # 工作进程与主进程共用同一个 resource_tracker，共享内存由主进程负责释放
+    shm_in, shm_out = SharedMemory(name=src[0]), SharedMemory(name=dst[0])
+    try:
+        x = np.ndarray(src[1], src[2], buffer=shm_in.buf)
+        y = np.ndarray(dst[1], dst[2], buffer=shm_out.buf)
+        with policy(precision):
+            y[r0:r1] = func(x[r0:r1], *args, **kwargs)
+        del x, y
+    finally:
+        shm_in.close()
+        shm_out.close()
+
+
+def runs_parallel(arr, workers=None, min_rows=MIN_PARALLEL_ROWS):
+    """row_map 对 arr 是否会在进程池中执行 (否则在当前进程中串行计算)"""
+    arr = np.asarray(arr)
+    row = arr.shape[0] if arr.ndim else 0
+    workers = min(resolve_workers(workers), max(row, 1))
+    return workers > 1 and row >= min_rows and arr.size >= MIN_PARALLEL_CELLS
+
+
+def row_map(func, arr, *args, workers=None, block_rows=None, out=None,
+            dtype=None, min_rows=MIN_PARALLEL_ROWS, **kwargs):
+    """
+    按行块并行执行 func(arr[r0:r1], *args, **kwargs)
+
+    参数:
+        func: 对光谱矩阵逐行独立计算、返回同形状结果的函数 (需可被 pickle，
+              如模块级函数、functools.partial 或 Pipeline)
+        arr: 输入光谱 (n_samples, n_points)
+        workers: 进程数，见 resolve_workers
+        block_rows: 每块的光谱条数，默认按进程数均分为 BLOCKS_PER_WORKER 倍的块数
+        out: 可选的输出数组
+        dtype: 输出dtype，默认按精度策略
+        min_rows: 光谱条数少于该值时在当前进程中串行计算
+
+    返回:
+        与arr同形状的结果
+
+    工作进程会重新导入主模块，脚本中的调用需放在 if __name__ == "__main__": 之下；
+    工作进程意外退出时抛出 BrokenProcessPool，并丢弃进程池，下次调用时重新创建。
+    """
+    arr = np.asarray(arr)
+    row = arr.shape[0] if arr.ndim else 0
+    workers = min(resolve_workers(workers), max(row, 1))
+    if not runs_parallel(arr, workers, min_rows):
+        res = func(arr, *args, **kwargs)
+        if out is None:
+            return res
+        out[...] = res
+        return out
+
+    dtype = np.dtype(dtype) if dtype is not None else result_dtype(arr.dtype)
+    if block_rows is None:
+        block_rows = -(-row // (workers * BLOCKS_PER_WORKER))
+    shm_in = SharedMemory(create=True, size=arr.nbytes)
+    try:
+        shm_out = SharedMemory(create=True, size=max(1, row * arr[0].size * dtype.itemsize))
+    except BaseException:
+        shm_in.close()
+        shm_in.unlink()
+        raise
+    try:
+        x = np.ndarray(arr.shape, arr.dtype, buffer=shm_in.buf)
+        x[...] = arr
+        src = (shm_in.name, arr.shape, arr.dtype.str)
+        dst = (shm_out.name, arr.shape, dtype.str)
+        try:
+            pool = _executor(workers)
+            futures = [pool.submit(_work, func, src, dst, r0,
+                                   min(r0 + block_rows, row), args, kwargs,
+                                   get_policy())
+                       for r0 in range(0, row, block_rows)]
+            # 某一块出错时也等所有块结束，再释放共享内存
+            wait(futures)
+            for fut in futures:
+                fut.result()
+        except BrokenProcessPool as e:
+            raise _broken(e) from e
+        y = np.ndarray(arr.shape, dtype, buffer=shm_out.buf)
+        if out is None:
+            out = y.copy()
+        else:
+            out[...] = y
+        del x, y
+    finally:
+        shm_in.close()
+        shm_in.unlink()
+        shm_out.close()
+        shm_out.unlink()
+    return out
+
+
+def _call(func, args, precision):
+    with policy(precision):
+        return func(*args)
+
+
+def map_tasks(func, tasks, workers=None):
+    """
+    在进程池中并行执行 func(*args)，args 取自 tasks，按顺序返回结果列表
+
+    任务少于2个或进程数为1时在当前进程中依次执行。
+    """
+    tasks = list(tasks)
+    workers = resolve_workers(workers)
+    if workers <= 1 or len(tasks) < 2:
+        return [func(*args) for args in tasks]
+    try:
+        pool = _executor(workers)
+        futures = [pool.submit(_call, func, args, get_policy()) for args in tasks]
+        return [fut.result() for fut in futures]
+    except BrokenProcessPool as e:
+        raise _broken(e) from e
+
+
+def rowwise(func, workers=None, **options):
+    """
+    将逐行处理的函数包装为并行版本，调用方式与原函数相同
+
+    options 为 row_map 的其他参数 (block_rows、min_rows 等)；
+    调用时也可通过 workers= 临时指定进程数。
+    """
+    @wraps(func)
+    def wrapper(arr, *args, workers=workers, **kwargs):
+        return row_map(func, arr, *args, workers=workers, **options, **kwargs)
+    return wrapper
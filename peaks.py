@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+批量峰检测与峰表
+
+对整个处理后的光谱矩阵 (n_spectra, n_points) 一次找出所有局部极大值，
+突出度和峰宽由一次 peak_prominences / peak_widths 调用在拼接后的一维序列上算出，
+峰位和峰高按三点抛物线插值细化到亚数据点精度。结果存入按波数排序、
+分箱索引的列式峰表，"哪些光谱在1003 cm^-1附近有峰" 只需查找对应的箱。
+"""
+import numpy as np
+from scipy.signal import peak_prominences, peak_widths
+
+
+def _within(values, bound):
+    """bound 为下限，或 (下限, 上限)，None 表示不限制"""
+    if bound is None:
+        return np.ones(values.shape, dtype=bool)
+    if np.ndim(bound) == 0:
+        return values >= bound
+    lo, hi = bound
+    keep = np.ones(values.shape, dtype=bool)
+    if lo is not None:
+        keep &= values >= lo
+    if hi is not None:
+        keep &= values <= hi
+    return keep
+
+
+def _parabolic(Y, rows, cols):
+    """三点抛物线插值：返回峰顶相对cols的偏移 (-0.5~0.5) 和插值后的峰高"""
+    y0 = Y[rows, cols - 1]
+    y1 = Y[rows, cols]
+    y2 = Y[rows, cols + 1]
+    denom = y0 - 2 * y1 + y2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta = np.where(denom != 0, 0.5 * (y0 - y2) / denom, 0.0)
+    delta = np.clip(delta, -0.5, 0.5)
+    return delta, y1 - 0.25 * (y0 - y2) * delta
+
+
+def _local_maxima(Y):
+    """
+    逐行的局部极大值 (行号, 列号)
+
+    只看相邻点差值的符号：每行中相邻的两个非零符号为 (+, -) 时，
+    两者之间 (可能为平台) 即为一个峰。
+    """
+    sign = np.sign(np.diff(Y, axis=1))
+    rows, steps = np.nonzero(sign)
+    up = sign[rows, steps] > 0
+    # 同一行中上升之后紧接着下降
+    hit = np.nonzero(up[:-1] & ~up[1:] & (rows[:-1] == rows[1:]))[0]
+    left = steps[hit] + 1
+    right = steps[hit + 1]
+    return rows[hit], (left + right) // 2
+
+
+def find_peaks(Y, wavenumbers=None, height=None, prominence=None, width=None,
+               rel_height=0.5, wlen=None, bin_width=2.0):
+    """
+    批量峰检测
+
+    参数:
+        Y: 处理后的光谱 (n_spectra, n_points)
+        wavenumbers: 拉曼位移一维数组；不给出时峰位和峰宽以数据点为单位
+        height: 峰高的下限或 (下限, 上限)
+        prominence: 突出度的下限或 (下限, 上限)
+        width: 峰宽 (与峰位同单位) 的下限或 (下限, 上限)
+        rel_height: 在峰高减去 rel_height * 突出度处测量峰宽 (0.5为半高宽)
+        wlen: 计算突出度时的窗口宽度 (数据点数)，默认不限制
+        bin_width: 峰表索引的分箱宽度
+
+    返回:
+        PeakTable
+
+    局部极大值的定义与 scipy.signal.find_peaks 相同：严格上升进入、严格下降离开的
+    点或平台，平台取中点 (偶数宽度取偏左的中点)。
+    """
+    Y = np.atleast_2d(np.asarray(Y, dtype=np.float64))
+    row, col = Y.shape
+    if wavenumbers is not None and len(wavenumbers) != col:
+        raise ValueError("波数长度与光谱点数不一致")
+
+    rows, cols = _local_maxima(Y)
+    keep = _within(Y[rows, cols], height)
+    rows, cols = rows[keep], cols[keep]
+
+    # 各行之间以 +inf 隔开后拼成一维序列：突出度和峰宽的搜索遇到 +inf 即停止，
+    # 与对每一行单独计算的结果相同
+    buf = np.empty((row, col + 1))
+    buf[:, :col] = Y
+    buf[:, col] = np.inf
+    flat = buf.ravel()
+    idx = rows * (col + 1) + cols
+    prom, left_base, right_base = peak_prominences(flat, idx, wlen=wlen)
+    keep = _within(prom, prominence)
+    rows, cols, idx = rows[keep], cols[keep], idx[keep]
+    prom_data = (prom[keep], left_base[keep], right_base[keep])
+    _, _, left_ips, right_ips = peak_widths(flat, idx, rel_height, prom_data)
+    left_ips -= rows * (col + 1)
+    right_ips -= rows * (col + 1)
+
+    delta, heights = _parabolic(Y, rows, cols)
+    points = np.arange(col)
+    if wavenumbers is None:
+        positions = cols + delta
+        widths = right_ips - left_ips
+    else:
+        wavenumbers = np.asarray(wavenumbers, dtype=np.float64)
+        positions = np.interp(cols + delta, points, wavenumbers)
+        widths = np.abs(np.interp(right_ips, points, wavenumbers)
+                        - np.interp(left_ips, points, wavenumbers))
+    keep = _within(widths, width)
+    return PeakTable(rows[keep], positions[keep], heights[keep],
+                     prom_data[0][keep], widths[keep], bin_width=bin_width,
+                     n_spectra=row)
+
+
+class PeakTable:
+    """
+    列式峰表，按峰位排序并按波数分箱索引
+
+    列: spectrum (光谱序号)、position (峰位)、height (峰高)、
+        prominence (突出度)、width (峰宽)
+    """
+
+    COLUMNS = ("spectrum", "position", "height", "prominence", "width")
+
+    def __init__(self, spectrum, position, height, prominence, width,
+                 bin_width=2.0, n_spectra=None):
+        order = np.argsort(position, kind='stable')
+        self.spectrum = np.asarray(spectrum, dtype=np.int32)[order]
+        self.position = np.asarray(position, dtype=np.float64)[order]
+        self.height = np.asarray(height)[order]
+        self.prominence = np.asarray(prominence)[order]
+        self.width = np.asarray(width)[order]
+        self.n_spectra = n_spectra
+        self.bin_width = float(bin_width)
+        # 分箱索引：第b箱的峰为 offsets[b]:offsets[b+1]
+        if len(self.position):
+            self.origin = np.floor(self.position[0] / self.bin_width) * self.bin_width
+            n_bins = int((self.position[-1] - self.origin) // self.bin_width) + 1
+        else:
+            self.origin, n_bins = 0.0, 0
+        edges = self.origin + self.bin_width * np.arange(n_bins + 1)
+        self.offsets = np.searchsorted(self.position, edges, side='left')
+        self.offsets[-1:] = len(self.position)
+
+    def __len__(self):
+        return len(self.position)
+
+    def _take(self, idx):
+        return PeakTable(self.spectrum[idx], self.position[idx], self.height[idx],
+                         self.prominence[idx], self.width[idx],
+                         self.bin_width, self.n_spectra)
+
+    def _bin(self, value):
+        return int(np.floor((value - self.origin) / self.bin_width))
+
+    def near(self, center, tol=5.0):
+        """峰位在 [center - tol, center + tol] 内的峰 (PeakTable)"""
+        if not len(self):
+            return self._take(slice(0, 0))
+        n_bins = len(self.offsets) - 1
+        b0 = min(max(self._bin(center - tol), 0), n_bins)
+        b1 = min(max(self._bin(center + tol) + 1, 0), n_bins)
+        i0, i1 = self.offsets[b0], self.offsets[b1]
+        pos = self.position[i0:i1]
+        hit = np.nonzero((pos >= center - tol) & (pos <= center + tol))[0]
+        return self._take(i0 + hit)
+
+    def spectra_near(self, center, tol=5.0):
+        """在 center ± tol 内有峰的光谱序号 (升序、不重复)"""
+        return np.unique(self.near(center, tol).spectrum)
+
+    def for_spectrum(self, i):
+        """某条光谱的所有峰"""
+        return self._take(np.nonzero(self.spectrum == i)[0])
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame({c: getattr(self, c) for c in self.COLUMNS})
+
+    def __repr__(self):
+        return f"PeakTable({len(self)} peaks, bin_width={self.bin_width:g})"
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+可组合的预处理流水线
+
+按 基线校准 → 平滑 → 数据变换 → 归一化 的顺序声明各处理步骤及参数，
+执行时按行块处理：每个块在两块复用的缓冲区之间依次流过所有步骤，
+不再为每个步骤分配一份完整的结果矩阵。Streamlit 界面与脚本共用同一套流程。
+
+流程配方 (recipe) 是可以保存为JSON的列表，例如:
+    [{"stage": "baseline", "method": "AsLS", "params": {"lam": 1e7, "p": 0.1}},
+     {"stage": "norm", "method": "L4"}]
+"""
+import numpy as np
+
+from parallel import resolve_workers, row_map, runs_parallel
+from precision import policy, result_dtype
+from registry import STAGES, get
+from stagecache import array_digest, stage_key
+
+# 未指定块大小时，每个缓冲块约占用的字节数 (尽量留在CPU缓存中)
+DEFAULT_BLOCK_BYTES = 4 << 20
+
+
+class Stage:
+    """流水线中的一个处理步骤"""
+
+    def __init__(self, method, params=None):
+        self.spec = get(method)
+        self.method = method
+        self.stage = self.spec.stage
+        self.params = dict(params or {})
+
+    @property
+    def label(self):
+        return self.spec.label(**self.params)
+
+    def to_dict(self):
+        return {"stage": self.stage, "method": self.method,
+                "params": dict(self.params)}
+
+    def apply(self, x, out, wavenumbers=None):
+        """处理一个数据块，结果写入out"""
+        return self.spec(x, out, wavenumbers, **self.params)
+
+    # 方法说明中含 lambda，序列化时只保存方法名和参数 (供多进程使用)
+    def __getstate__(self):
+        return {"method": self.method, "params": self.params}
+
+    def __setstate__(self, state):
+        self.__init__(state["method"], state["params"])
+
+    def __repr__(self):
+        return f"Stage({self.method!r}, {self.params!r})"
+
+
+def _run_rows(y, pipeline, wavenumbers, block_rows):
+    """在工作进程中串行执行流水线 (供 parallel.row_map 调用)"""
+    return pipeline._run(y, wavenumbers, block_rows, None, None)
+
+
+class Pipeline:
+    """
+    预处理流水线
+
+    参数:
+        stages: Stage 列表，按 STAGES 的先后顺序排列
+    """
+
+    def __init__(self, stages=()):
+        self.stages = list(stages)
+        order = [STAGES.index(s.stage) for s in self.stages]
+        if order != sorted(order):
+            raise ValueError("处理步骤顺序应为: " + " → ".join(STAGES))
+
+    @classmethod
+    def from_recipe(cls, recipe):
+        return cls(Stage(item["method"], item.get("params"))
+                   for item in recipe)
+
+    def to_recipe(self):
+        return [s.to_dict() for s in self.stages]
+
+    @property
+    def label(self):
+        """处理流程说明，如 "AsLS(λ=1.0e+07,p=0.1) → L4范数" """
+        return " → ".join(s.label for s in self.stages)
+
+    def __len__(self):
+        return len(self.stages)
+
+    def run(self, y, wavenumbers=None, block_rows=None, out=None, cache=None,
+            profiler=None, precision=None, workers=None, checkpoints=()):
+        """
+        执行流水线
+
+        参数:
+            y: 输入光谱 (n_samples, n_points)
+            wavenumbers: 拉曼位移一维数组 (I-ModPoly 等方法需要)
+            block_rows: 每块的光谱条数，默认按约4MB一块估算
+            out: 可选的输出数组
+            cache: 可选的 StageCache；给出时缓存最终结果及 checkpoints 步骤的结果，
+                   从已缓存的最长前缀继续执行 (此时返回的数组为只读，out被忽略)
+            profiler: 可选的 profiling.Profiler，记录每个步骤的耗时、内存和迭代次数
+            precision: 精度策略 "preserve"/"float32"/"float64"，默认使用当前策略
+                       (见 precision 模块)，缓冲区和结果均为该策略下的dtype
+            workers: 并行进程数 (见 parallel 模块)，默认使用 parallel.set_workers 的设置；
+                     光谱条数较少时自动串行。并行时 profiler 只记录各步骤的墙钟时间，
+                     工作进程内的CPU时间、峰值内存和迭代次数不会被记录；
+                     工作进程会重新导入主模块，脚本中的调用需放在
+                     if __name__ == "__main__": 之下
+            checkpoints: 使用 cache 时另外缓存结果的处理步骤名 (如 ("baseline",))，
+                         只改下游步骤时可从这些步骤之后继续执行
+
+        返回:
+            处理后的光谱，形状与y相同
+        """
+        workers = resolve_workers(workers)
+        with policy(precision):
+            if cache is not None:
+                return self._run_cached(y, wavenumbers, block_rows, cache,
+                                        profiler, workers, checkpoints)
+            return self._run(y, wavenumbers, block_rows, out, profiler, workers)
+
+    def _run(self, y, wavenumbers, block_rows, out, profiler, workers=1):
+        y = np.asarray(y)
+        if self.stages and runs_parallel(y, workers):
+            return self._run_parallel(y, wavenumbers, block_rows, out, profiler,
+                                      workers)
+        row, col = y.shape
+        dtype = result_dtype(y.dtype)
+        if out is None:
+            out = np.empty((row, col), dtype=dtype)
+        if not self.stages:
+            out[...] = y
+            return out
+        if block_rows is None:
+            block_rows = max(1, DEFAULT_BLOCK_BYTES // (col * dtype.itemsize))
+        block_rows = min(block_rows, row) or 1
+
+        # 两块乒乓缓冲区：每个步骤从一块读、向另一块写
+        bufs = (np.empty((block_rows, col), dtype=dtype),
+                np.empty((block_rows, col), dtype=dtype))
+        for r0 in range(0, row, block_rows):
+            r1 = min(r0 + block_rows, row)
+            src = bufs[0][:r1 - r0]
+            src[...] = y[r0:r1]
+            k = 0
+            for stage in self.stages:
+                dst = bufs[1 - k][:r1 - r0]
+                if profiler is None:
+                    stage.apply(src, dst, wavenumbers)
+                else:
+                    with profiler.stage(stage.label, src):
+                        stage.apply(src, dst, wavenumbers)
+                src, k = dst, 1 - k
+            out[r0:r1] = src
+        return out
+
+    def _run_parallel(self, y, wavenumbers, block_rows, out, profiler, workers):
+        # 各进程对分到的行块串行执行整个流水线
+        if profiler is None:
+            return row_map(_run_rows, y, self, wavenumbers, block_rows,
+                           workers=workers, out=out)
+        # 需要记录时各步骤依次并行执行，分别计时 (只计墙钟时间)
+        result = y
+        for stage in self.stages:
+            with profiler.stage(stage.label, result, parallel=True):
+                result = row_map(_run_rows, result, Pipeline([stage]),
+                                 wavenumbers, block_rows, workers=workers)
+        if out is None:
+            return result
+        out[...] = result
+        return out
+
+    def _run_cached(self, y, wavenumbers, block_rows, cache, profiler=None,
+                    workers=1, checkpoints=()):
+        # 每一步的键由输入数据哈希和此前所有步骤的方法、参数依次串联而成
+        key = stage_key(array_digest(y), "dtype",
+                        result_dtype(np.asarray(y).dtype).str)
+        if wavenumbers is not None:
+            key = stage_key(key, "wavenumbers", array_digest(wavenumbers))
+        keys = []
+        for stage in self.stages:
+            key = stage_key(key, stage.method, stage.params)
+            keys.append(key)
+
+        # 从后往前找到已缓存的最长前缀
+        start, result = 0, y
+        for i in range(len(keys) - 1, -1, -1):
+            hit = cache.get(keys[i])
+            if hit is not None:
+                start, result = i + 1, hit
+                break
+        if profiler is not None:
+            for stage in self.stages[:start]:
+                profiler.cached(stage.label, result)
+
+        # 相邻两个缓存点之间的步骤按行块融合执行，只有缓存点的结果保存为完整矩阵
+        stops = [i for i, stage in enumerate(self.stages)
+                 if stage.stage in checkpoints or i == len(self.stages) - 1]
+        for stop in stops:
+            if stop < start:
+                continue
+            segment = Pipeline(self.stages[start:stop + 1])
+            result = cache.put(keys[stop],
+                               segment._run(result, wavenumbers, block_rows,
+                                            None, profiler, workers))
+            start = stop + 1
+        return result
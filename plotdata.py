@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+光谱可视化的数据层
+
+大批量光谱不再整体发送到浏览器：先按需取波数范围，再把每条曲线抽稀到屏幕宽度
+(min/max 包络或 LTTB)，并提供均值、分位带和抽样光谱等汇总视图，
+绘图数据量只取决于显示宽度，与光谱条数无关。
+"""
+import numpy as np
+import pandas as pd
+
+# 计算分位带时最多使用的光谱条数，超过时随机抽样
+MAX_BAND_SPECTRA = 2000
+
+
+def zoom(x, Y, x_range=None):
+    """
+    截取波数范围 [lo, hi] 内的数据 (波数升序或降序均可)
+
+    返回:
+        (x, Y) 的切片视图
+    """
+    if x_range is None:
+        return x, Y
+    lo, hi = sorted(x_range)
+    descending = len(x) > 1 and x[0] > x[-1]
+    xs = x[::-1] if descending else x
+    i0 = np.searchsorted(xs, lo, side='left')
+    i1 = np.searchsorted(xs, hi, side='right')
+    if descending:
+        i0, i1 = len(x) - i1, len(x) - i0
+    return x[i0:i1], Y[..., i0:i1]
+
+
+def minmax_decimate(x, Y, n_out):
+    """
+    min/max 包络抽稀：按点数均分为 n_out // 2 段，每段保留最小值和最大值 (按出现先后排列)
+
+    参数:
+        x: 波数一维数组 (n_points,)
+        Y: 光谱 (n_traces, n_points)
+        n_out: 输出点数上限
+
+    返回:
+        (x_out, Y_out)，所有曲线共用 x_out
+    """
+    Y = np.atleast_2d(Y)
+    n = Y.shape[-1]
+    n_bins = max(1, n_out // 2)
+    if n <= n_out:
+        return x, Y
+    size = -(-n // n_bins)
+    n_bins = -(-n // size)
+    pad = n_bins * size - n
+    Yb = np.pad(Y, ((0, 0), (0, pad)), mode='edge').reshape(len(Y), n_bins, size)
+    imin = Yb.argmin(axis=2)
+    imax = Yb.argmax(axis=2)
+    vmin = np.take_along_axis(Yb, imin[..., None], axis=2)[..., 0]
+    vmax = np.take_along_axis(Yb, imax[..., None], axis=2)[..., 0]
+
+    first = np.where(imin <= imax, vmin, vmax)
+    second = np.where(imin <= imax, vmax, vmin)
+    Y_out = np.stack([first, second], axis=2).reshape(len(Y), 2 * n_bins)
+    left = np.arange(n_bins) * size
+    right = np.minimum(left + size, n) - 1
+    x_out = np.stack([x[left], x[right]], axis=1).ravel()
+    return x_out, Y_out
+
+
+def lttb(x, Y, n_out):
+    """
+    LTTB (Largest-Triangle-Three-Buckets) 抽稀，各曲线同时计算
+
+    返回:
+        (x_out, Y_out)，形状均为 (n_traces, n_out)，每条曲线保留的点位置可能不同
+    """
+    Y = np.atleast_2d(Y)
+    n = Y.shape[-1]
+    rows = np.arange(len(Y))
+    if n <= n_out or n_out < 3:
+        return np.broadcast_to(x, Y.shape), Y
+    x = np.asarray(x, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    idx = np.zeros((len(Y), n_out), dtype=np.intp)
+    idx[:, -1] = n - 1
+    a = np.zeros(len(Y), dtype=np.intp)
+    for i in range(n_out - 2):
+        b0, b1 = edges[i], edges[i + 1]
+        # 下一段的平均点 (最后一段取末点)
+        n0, n1 = b1, edges[i + 2] if i + 2 < len(edges) else n
+        x_avg = x[n0:n1].mean()
+        y_avg = Y[:, n0:n1].mean(axis=1)
+        xa = x[a]
+        ya = Y[rows, a]
+        area = np.abs((xa[:, None] - x_avg) * (Y[:, b0:b1] - ya[:, None])
+                      - (xa[:, None] - x[b0:b1]) * (y_avg - ya)[:, None])
+        a = b0 + area.argmax(axis=1)
+        idx[:, i + 1] = a
+    return x[idx], np.take_along_axis(Y, idx, axis=1)
+
+
+def sample_spectra(n_spectra, k, seed=0):
+    """等概率抽取k条光谱的行号 (升序，固定随机种子以便重复显示同一批)"""
+    k = min(k, n_spectra)
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(n_spectra, size=k, replace=False))
+
+
+def aggregate(Y, percentiles=(5, 50, 95), seed=0):
+    """
+    汇总曲线：均值和各分位数
+
+    分位数在光谱条数超过 MAX_BAND_SPECTRA 时基于随机抽样计算。
+
+    返回:
+        {名称: 曲线} 的字典
+    """
+    curves = {"均值": Y.mean(axis=0)}
+    if percentiles:
+        sub = Y
+        if len(Y) > MAX_BAND_SPECTRA:
+            sub = Y[sample_spectra(len(Y), MAX_BAND_SPECTRA, seed)]
+        values = np.percentile(sub, percentiles, axis=0)
+        for q, v in zip(percentiles, values):
+            curves[f"P{q:g}"] = v
+    return curves
+
+
+def chart_frame(x, Y, view="mean", width=1000, x_range=None, n_sample=10,
+                percentiles=(5, 50, 95), method="minmax", name="", seed=0):
+    """
+    生成绘图用的长表 DataFrame (列: 波数、强度、曲线)，可直接用于
+    st.line_chart(df, x="波数", y="强度", color="曲线")
+
+    参数:
+        x: 波数一维数组
+        Y: 光谱 (n_spectra, n_points)
+        view: "mean" 均值，"bands" 均值与分位带，"sample" 抽样光谱
+        width: 每条曲线最多保留的点数 (约等于屏幕宽度像素)
+        x_range: 可选的波数范围 (lo, hi)，只对该范围内的数据抽稀，放大时分辨率更高
+        n_sample: "sample" 视图的抽样条数
+        percentiles: "bands" 视图的分位数
+        method: 抽稀方法，"minmax" 或 "lttb"
+        name: 曲线名称前缀 (如 "原始数据")
+    """
+    x = np.asarray(x)
+    x, Y = zoom(x, np.atleast_2d(Y), x_range)
+    if view == "mean":
+        curves = aggregate(Y, percentiles=(), seed=seed)
+    elif view == "bands":
+        curves = aggregate(Y, percentiles, seed=seed)
+    elif view == "sample":
+        rows = sample_spectra(len(Y), n_sample, seed)
+        curves = {f"#{i}": Y[i] for i in rows}
+    else:
+        raise ValueError(f"未知的显示方式: {view}")
+
+    labels = [f"{name}-{k}" if name else k for k in curves]
+    stacked = np.array(list(curves.values()))
+    if method == "minmax":
+        xs, ys = minmax_decimate(x, stacked, width)
+        xs = np.broadcast_to(xs, ys.shape)
+    elif method == "lttb":
+        xs, ys = lttb(x, stacked, width)
+    else:
+        raise ValueError(f"未知的抽稀方法: {method}")
+    return pd.DataFrame({
+        "波数": np.ravel(xs),
+        "强度": np.ravel(ys),
+        "曲线": np.repeat(labels, ys.shape[1]),
+    })
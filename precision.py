@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+计算精度策略
+
+各处理函数的输出 dtype 由当前策略决定:
+    "preserve": 浮点输入保持原 dtype (float16 提升为 float32)；不超过16位的整数
+                (如 uint16 探测器计数) 按 float32，可精确表示，其他类型按 float64
+    "float32": 一律以 float32 计算和输出
+    "float64": 一律以 float64 计算和输出 (与旧版行为相同)
+平滑、变换、归一化等访存密集的步骤直接在该 dtype 上计算；AsLS、I-ModPoly、MSC
+等最小二乘求解在内部提升为 float64，仅输出按策略的 dtype 存放。
+
+用法:
+    set_policy("float32")           # 全局设置
+    with policy("float32"):         # 仅在代码块内生效
+        y = pipeline.run(spectra)
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import numpy as np
+
+POLICIES = ("preserve", "float32", "float64")
+
+_default = "preserve"
+# 代码块内的临时策略，优先于全局设置
+_override = ContextVar("precision_policy", default=None)
+
+
+def _check(name):
+    if name not in POLICIES:
+        raise ValueError(f"未知的精度策略: {name}，可选: {', '.join(POLICIES)}")
+    return name
+
+
+def get_policy():
+    return _override.get() or _default
+
+
+def set_policy(name):
+    """设置全局精度策略"""
+    global _default
+    _default = _check(name)
+
+
+@contextmanager
+def policy(name):
+    """在代码块内临时使用指定的精度策略 (name 为None时不改变)"""
+    if name is None:
+        yield get_policy()
+        return
+    token = _override.set(_check(name))
+    try:
+        yield name
+    finally:
+        _override.reset(token)
+
+
+def result_dtype(dtype, name=None):
+    """输入 dtype 在精度策略下对应的计算/输出 dtype"""
+    name = _check(name) if name else get_policy()
+    if name == "float32":
+        return np.dtype(np.float32)
+    if name == "float64":
+        return np.dtype(np.float64)
+    dtype = np.dtype(dtype)
+    if dtype == np.float16:
+        return np.dtype(np.float32)
+    if np.issubdtype(dtype, np.floating):
+        return dtype
+    if (np.issubdtype(dtype, np.integer) or dtype == np.bool_) and dtype.itemsize <= 2:
+        return np.dtype(np.float32)
+    return np.dtype(np.float64)
+
+
+def working(arr, name=None):
+    """按精度策略转换输入 (dtype 已符合时不复制)"""
+    arr = np.asarray(arr)
+    return arr.astype(result_dtype(arr.dtype, name), copy=False)
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+处理步骤的性能记录
+
+Profiler 记录每个步骤的墙钟时间、CPU时间、峰值内存、输入形状/dtype 和迭代次数，
+可生成表格供界面显示，也可按行输出JSON日志供批处理使用。
+未传入 Profiler 时流水线不做任何记录；各算法内的 note_iterations 只读取一次
+线程局部变量，开销可忽略。
+"""
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger("raman.profiling")
+
+# 当前线程正在记录的步骤 (供 note_iterations 使用)，
+# 以及由 Profiler 开启的 tracemalloc 记录中各层 stage 在重置前观测到的峰值
+_local = threading.local()
+
+
+def _peak_frames():
+    frames = getattr(_local, "peaks", None)
+    if frames is None:
+        frames = _local.peaks = []
+    return frames
+
+
+def note_iterations(counts):
+    """
+    由带收敛判据的算法 (AsLS、I-ModPoly) 报告迭代次数
+
+    参数:
+        counts: 整数，或每条光谱的迭代次数数组
+    未在记录中时直接返回。
+    """
+    rec = getattr(_local, "record", None)
+    if rec is None:
+        return
+    counts = np.asarray(counts)
+    rec.iterations += int(counts.sum())
+    rec.max_iterations = max(rec.max_iterations, int(counts.max(initial=0)))
+    rec.iterated_spectra += counts.size if counts.ndim else 1
+
+
+class StageRecord:
+    """一个步骤的累计记录 (按块执行时各块累加)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_bytes = None
+        self.rows = 0
+        self.points = None
+        self.dtype = None
+        self.iterations = 0
+        self.max_iterations = 0
+        self.iterated_spectra = 0
+        self.cached = False
+        self.parallel = False
+
+    def to_dict(self):
+        # 并行执行时主进程测得的CPU时间和内存不包括工作进程，不予报告
+        d = {"name": self.name, "calls": self.calls,
+             "wall_s": self.wall, "cpu_s": None if self.parallel else self.cpu,
+             "peak_mb": (None if self.peak_bytes is None or self.parallel
+                         else self.peak_bytes / 2 ** 20),
+             "shape": [self.rows, self.points], "dtype": self.dtype,
+             "cached": self.cached, "parallel": self.parallel}
+        if self.iterated_spectra:
+            d["mean_iterations"] = self.iterations / self.iterated_spectra
+            d["max_iterations"] = self.max_iterations
+        return d
+
+
+class Profiler:
+    """
+    处理步骤的性能记录器
+
+    参数:
+        memory: 是否用 tracemalloc 记录峰值内存 (会使运行变慢，默认开启)；
+                调用方已开启 tracemalloc 时不重置其峰值，
+                步骤内的峰值未超过调用方记录的已有峰值时该步骤的峰值内存为None
+    """
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.records = {}
+
+    def _record(self, name):
+        rec = self.records.get(name)
+        if rec is None:
+            rec = self.records[name] = StageRecord(name)
+        return rec
+
+    @contextmanager
+    def stage(self, name, x=None, parallel=False):
+        """
+        记录一次调用，同名的多次调用 (如按块执行) 累加到同一条记录
+
+        parallel 为True表示该步骤在工作进程中执行，只记录墙钟时间，
+        CPU时间和峰值内存留空 (主进程测不到工作进程的用量)。
+
+        用法:
+            with profiler.stage("AsLS", y):
+                baseline_als(y, lam, p)
+        """
+        rec = self._record(name)
+        prev = getattr(_local, "record", None)
+        _local.record = rec
+        rec.parallel = rec.parallel or parallel
+        memory = self.memory and not parallel
+        if memory:
+            frames = _peak_frames()
+            started = not tracemalloc.is_tracing()
+            # 由外层 stage 开启的记录可以重置峰值；调用方自己开启的记录不重置
+            owned = started or bool(frames)
+            if started:
+                tracemalloc.start()
+            elif owned:
+                # 重置前保存当前峰值，外层 stage 退出时取两者的较大值
+                peak = tracemalloc.get_traced_memory()[1]
+                for frame in frames:
+                    frame[0] = max(frame[0], peak)
+                tracemalloc.reset_peak()
+            base, start_peak = tracemalloc.get_traced_memory()
+            frame = [0]
+            if owned:
+                frames.append(frame)
+        t0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield rec
+        finally:
+            rec.wall += time.perf_counter() - t0
+            rec.cpu += time.process_time() - c0
+            if memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                if owned:
+                    frames.pop()
+                    peak = max(peak, frame[0])
+                # 调用方开启的记录中峰值未超过进入时的值，本步骤的峰值无法测得
+                if owned or peak > start_peak:
+                    rec.peak_bytes = max(rec.peak_bytes or 0, peak - base)
+                if started:
+                    tracemalloc.stop()
+            rec.calls += 1
+            if x is not None:
+                rec.rows += x.shape[0] if x.ndim > 1 else 1
+                rec.points = x.shape[-1]
+                rec.dtype = str(x.dtype)
+            _local.record = prev
+
+    def cached(self, name, x):
+        """记录一个直接取自缓存、未实际执行的步骤"""
+        rec = self._record(name)
+        rec.cached = True
+        rec.rows, rec.points, rec.dtype = x.shape[0], x.shape[-1], str(x.dtype)
+
+    def to_dicts(self):
+        return [rec.to_dict() for rec in self.records.values()]
+
+    def to_frame(self):
+        """界面显示用的表格"""
+        import pandas as pd
+        rows = []
+        for d in self.to_dicts():
+            rows.append({
+                "步骤": d["name"],
+                "耗时(ms)": d["wall_s"] * 1e3,
+                "CPU(ms)": None if d["cpu_s"] is None else d["cpu_s"] * 1e3,
+                "峰值内存(MB)": d["peak_mb"],
+                "形状": f"{d['shape'][0]}×{d['shape'][1]}",
+                "dtype": d["dtype"],
+                "平均迭代": d.get("mean_iterations"),
+                "最大迭代": d.get("max_iterations"),
+                "缓存": d["cached"],
+                "并行": d["parallel"],
+            })
+        return pd.DataFrame(rows)
+
+    def log(self, level=logging.INFO, **extra):
+        """每个步骤输出一行JSON日志，extra 中的字段 (如文件名) 一并写入"""
+        for d in self.to_dicts():
+            logger.log(level, json.dumps({**extra, **d}, ensure_ascii=False))
+
+    def __repr__(self):
+        return f"Profiler({list(self.records)!r})"
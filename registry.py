@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+预处理方法注册表
+
+描述每个方法所属的处理步骤、界面显示名称、参数及其界面控件，
+实现模块在第一次调用时才导入 (importlib)，启动时不加载 scipy/pywt 等依赖。
+流水线 (pipeline) 和界面 (main.py) 的下拉框均由此生成，新增方法只需在 REGISTRY 中登记。
+"""
+import importlib
+
+import numpy as np
+
+# 处理步骤的先后顺序
+STAGES = ("baseline", "smoothing", "transform", "norm")
+
+# 处理步骤 -> (界面小标题, 下拉框标题, 下拉框的 session_state 键)
+STAGE_UI = {
+    "baseline": ("基线校准", "基线校准方法", "baseline_method"),
+    "smoothing": ("平滑", "平滑方法", "smooth_method"),
+    "transform": ("🧩 数据变换", "变换方法", "transform_method"),
+    "norm": ("归一化", "归一化方法", "norm_method"),
+}
+
+
+class Param:
+    """
+    方法参数及其界面控件
+
+    参数:
+        name: 传给实现函数的参数名
+        label: 界面显示的名称
+        widget: "slider"、"number"、"checkbox"、"select"，或 "fixed" (不显示，固定取default)
+        default: 默认值
+        options: select 控件的可选值
+        min, max, step: 控件的取值范围和步长
+        format: number 控件的显示格式
+        help: 控件的提示文字
+        key: 控件的 session_state 键，默认与name相同
+    """
+
+    def __init__(self, name, label=None, widget="fixed", default=None, min=None,
+                 max=None, step=None, format=None, help=None, key=None, options=None):
+        self.name = name
+        self.label = label or name
+        self.widget = widget
+        self.default = default
+        self.options = list(options or ())
+        self.min = min
+        self.max = max
+        self.step = step
+        self.format = format
+        self.help = help
+        self.key = key or name
+
+    def __repr__(self):
+        return f"Param({self.name!r}, widget={self.widget!r}, default={self.default!r})"
+
+
+class MethodSpec:
+    """
+    预处理方法说明
+
+    参数:
+        name: 方法名 (配方中的 method)
+        stage: 所属处理步骤
+        title: 界面下拉框中的显示名称
+        target: 实现函数 "模块:函数名"，第一次调用时导入
+        data_arg: 实现函数接收光谱矩阵的参数名
+        params: Param 列表
+        fixed: 由方法本身决定、不出现在配方中的附加参数 (如范数阶数)
+        needs_wavenumbers: 是否需要传入 wavenumbers 参数
+        supports_out: 实现函数是否支持 out 参数 (结果直接写入输出缓冲区)
+        label: 流程说明函数 label(**params)
+        info: 选中时界面显示的说明
+    """
+
+    def __init__(self, name, stage, title, target, data_arg="arr", params=(),
+                 fixed=None, needs_wavenumbers=False, supports_out=False,
+                 label=None, info=None):
+        if stage not in STAGES:
+            raise ValueError(f"未知的处理步骤: {stage}")
+        self.name = name
+        self.stage = stage
+        self.title = title
+        self.target = target
+        self.data_arg = data_arg
+        self.params = tuple(params)
+        self.fixed = dict(fixed or {})
+        self.needs_wavenumbers = needs_wavenumbers
+        self.supports_out = supports_out
+        self._label = label
+        self.info = info
+        self._func = None
+
+    @property
+    def func(self):
+        """实现函数 (第一次访问时导入模块)"""
+        if self._func is None:
+            module, attr = self.target.split(":")
+            self._func = getattr(importlib.import_module(module), attr)
+        return self._func
+
+    def defaults(self):
+        """界面控件的默认参数"""
+        return {p.name: p.default for p in self.params}
+
+    def label(self, **params):
+        if self._label is None:
+            return self.name
+        return self._label(**params)
+
+    def __call__(self, x, out, wavenumbers=None, **params):
+        """处理一个数据块，结果写入out"""
+        kwargs = {self.data_arg: x, **self.fixed, **params}
+        if self.needs_wavenumbers:
+            if wavenumbers is None:
+                raise ValueError(f"{self.name} 需要波数数据")
+            kwargs["wavenumbers"] = wavenumbers
+        if self.supports_out:
+            self.func(out=out, **kwargs)
+        else:
+            out[...] = self.func(**kwargs)
+        return out
+
+    def __repr__(self):
+        return f"MethodSpec({self.name!r}, {self.stage!r}, {self.target!r})"
+
+
+def _smooth_window(default):
+    return Param("n", "窗口宽度", "slider", default, 3, 31, 2, key="smooth_n")
+
+
+REGISTRY = {spec.name: spec for spec in [
+    # 基线校准
+    MethodSpec("SD", "baseline", "SD", "savgol:difference", fixed={"order": 2},
+               supports_out=True, label=lambda: "SD基线校准"),
+    MethodSpec("FD", "baseline", "FD", "savgol:difference", fixed={"order": 1},
+               supports_out=True, label=lambda: "FD基线校准"),
+    MethodSpec("I-ModPoly", "baseline", "I-ModPoly", "IModPoly:IModPoly",
+               data_arg="originalRaman", needs_wavenumbers=True,
+               params=[Param("polyorder", "多项式阶数", "slider", 6, 3, 10)],
+               label=lambda polyorder: f"I-ModPoly(阶数={polyorder})"),
+    MethodSpec("AsLS", "baseline", "AsLS", "AsLS:baseline_als", data_arg="y",
+               params=[Param("lam", "λ(平滑度)", "number", 1e7, format="%e"),
+                       Param("p", "p(不对称性)", "slider", 0.1, 0.01, 0.5),
+                       Param("niter", default=10),
+                       Param("warm_start", "相邻光谱热启动 (标准AsLS)", "checkbox", False,
+                             help="改用标准AsLS (右端项为 W·y，迭代至权重收敛)，并以上一条光谱的基线"
+                                  "为起点，适合时间序列和面扫描数据，可减少迭代次数；"
+                                  "得到的基线与默认算法不同")],
+               label=lambda lam, p, niter=10, warm_start=False:
+               f"AsLS(λ={lam:.1e},p={p}{',标准AsLS热启动' if warm_start else ''})"),
+    # 平滑
+    MethodSpec("SG", "smoothing", "SG", "savgol:savgol", supports_out=True,
+               params=[Param("window", "窗口宽度", "slider", 11, 5, 51, 2, key="sg_window"),
+                       Param("polyorder", "多项式阶数", "slider", 3, 1, 5, key="sg_order")],
+               label=lambda window, polyorder: f"SG(窗口={window},阶数={polyorder})"),
+    MethodSpec("MWA", "smoothing", "MWA", "ArithmeticAverage:MWA",
+               params=[_smooth_window(7)],
+               label=lambda n=6, it=1: f"MWA(窗口={n})"),
+    MethodSpec("MWM", "smoothing", "MWM", "meadianfiltering:MWM",
+               params=[_smooth_window(7)],
+               label=lambda n=7, it=1: f"MWM(窗口={n})"),
+    MethodSpec("wavelet", "smoothing", "小波去噪", "wavelettransform:wavelet_denoise",
+               params=[Param("wavelet", "小波", "select", "db8", key="wavelet",
+                             options=["db4", "db8", "sym8", "coif3"]),
+                       Param("level", "分解层数", "slider", 0, 0, 10, key="wavelet_level",
+                             help="0 表示取最大可分解层数"),
+                       Param("mode", "阈值方式", "select", "soft", key="wavelet_mode",
+                             options=["soft", "hard"]),
+                       Param("rule", "阈值规则", "select", "universal", key="wavelet_rule",
+                             options=["universal", "level"],
+                             help="universal: 由最细一层估计噪声，各层共用阈值；level: 各层分别估计噪声")],
+               label=lambda wavelet, level, mode, rule:
+               f"小波去噪({wavelet},层数={level or '自动'},{mode},{rule})"),
+    # 数据变换
+    MethodSpec("i_squashing", "transform", "挤压函数(归一化版)", "transform:i_squashing",
+               data_arg="X", supports_out=True, label=lambda: "i_squashing",
+               info="此方法会自动对数据进行归一化处理"),
+    MethodSpec("squashing", "transform", "挤压函数(原始版)", "transform:squashing",
+               data_arg="X", supports_out=True, label=lambda: "squashing"),
+    MethodSpec("i_sigmoid", "transform", "Sigmoid(归一化版)", "transform:i_sigmoid",
+               data_arg="X", supports_out=True,
+               params=[Param("maxn", "归一化系数", "slider", 10, 1, 20,
+                             help="控制归一化程度，值越大归一化效果越强")],
+               label=lambda maxn=10: f"i_sigmoid(maxn={maxn})"),
+    MethodSpec("sigmoid", "transform", "Sigmoid(原始版)", "transform:sigmoid",
+               data_arg="X", supports_out=True, label=lambda: "sigmoid"),
+    # 归一化
+    MethodSpec("Linf", "norm", "无穷大范数", "LPnorm:LPnorm", fixed={"ord": np.inf},
+               supports_out=True, label=lambda: "无穷大范数"),
+    MethodSpec("L10", "norm", "L10范数", "LPnorm:LPnorm", fixed={"ord": 10},
+               supports_out=True, label=lambda: "L10范数"),
+    MethodSpec("L4", "norm", "L4范数", "LPnorm:LPnorm", fixed={"ord": 4},
+               supports_out=True, label=lambda: "L4范数"),
+]}
+
+
+def get(name):
+    """按方法名取得 MethodSpec"""
+    try:
+        return REGISTRY[name]
+    except KeyError:
+        raise ValueError(f"未知的处理方法: {name}") from None
+
+
+def methods(stage):
+    """某个处理步骤的所有方法 (按登记顺序)"""
+    return [spec for spec in REGISTRY.values() if spec.stage == stage]
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Savitzky-Golay 平滑/求导引擎
+
+卷积核与边缘拟合矩阵按 (窗口, 阶数, 导数阶) 缓存，对整个矩阵沿点轴一次完成计算。
+SGfilter、D1、D2 均为该引擎的简单封装。
+"""
+from functools import lru_cache
+from math import factorial
+
+import numpy as np
+from scipy.ndimage import convolve1d
+from scipy.signal import savgol_coeffs
+
+from precision import working
+
+
+@lru_cache(maxsize=32)
+def _sg_kernel(window, polyorder, deriv):
+    """卷积形式的SG系数 (delta=1)"""
+    k = savgol_coeffs(window, polyorder, deriv=deriv, use='conv')
+    k.flags.writeable = False
+    return k
+
+
+@lru_cache(maxsize=32)
+def _sg_edge_matrices(window, polyorder, deriv):
+    """
+    边缘处理矩阵 (与 savgol_filter 的 mode='interp' 一致)
+
+    对首/尾各window个点做polyorder阶多项式拟合，并在首/尾halflen个点处求deriv阶导数。
+    该运算对数据是线性的，可写成 (halflen, window) 的矩阵，返回 (左边缘, 右边缘)。
+    """
+    halflen = window // 2
+    # 以窗口中心为原点拟合，改善条件数，导数值不变
+    t = np.arange(window) - (window - 1) / 2
+    pinv = np.linalg.pinv(np.polynomial.polynomial.polyvander(t, polyorder))
+
+    def evaluate(u):
+        # 在u处对各幂次求deriv阶导数的取值
+        D = np.zeros((len(u), polyorder + 1))
+        for m in range(deriv, polyorder + 1):
+            D[:, m] = factorial(m) / factorial(m - deriv) * u ** (m - deriv)
+        return D @ pinv
+
+    left = evaluate(t[:halflen])
+    right = evaluate(t[window - halflen:])
+    left.flags.writeable = False
+    right.flags.writeable = False
+    return left, right
+
+
+def savgol(arr, window, polyorder, deriv=0, delta=1.0, axis=-1, out=None):
+    """
+    Savitzky-Golay 平滑或求导
+
+    参数:
+        arr: 输入光谱 (n_samples, n_points)
+        window: 窗口宽度 (奇数)
+        polyorder: 多项式阶数
+        deriv: 导数阶数，0为平滑，1/2为平滑后的一阶/二阶导数
+        delta: 采样间隔，用于导数的缩放
+        axis: 计算方向，默认沿点轴
+        out: 可选的输出数组
+
+    返回:
+        处理后的光谱，结果与 scipy.signal.savgol_filter(mode='interp') 一致，
+        dtype按精度策略
+    """
+    if window % 2 == 0:
+        raise ValueError("窗口宽度必须为奇数")
+    if polyorder >= window:
+        raise ValueError("多项式阶数必须小于窗口宽度")
+    x = np.moveaxis(working(arr), axis, -1)
+    if x.shape[-1] < window:
+        raise ValueError("窗口宽度不能大于光谱点数")
+    if out is None:
+        out = np.empty(np.shape(arr), dtype=x.dtype)
+    y = np.moveaxis(out, axis, -1)
+
+    scale = 1.0 / delta ** deriv
+    convolve1d(x, _sg_kernel(window, polyorder, deriv), axis=-1,
+               mode='constant', output=y)
+    left, right = _sg_edge_matrices(window, polyorder, deriv)
+    halflen = window // 2
+    if halflen:
+        y[..., :halflen] = x[..., :window] @ left.T
+        y[..., -halflen:] = x[..., -window:] @ right.T
+    if scale != 1.0:
+        y *= scale
+    return out
+
+
+def difference(arr, order, axis=-1, out=None):
+    """
+    前向差分，末尾用最后一个差分值补齐，输出尺寸与输入相同
+
+    参数:
+        arr: 输入光谱 (n_samples, n_points)
+        order: 差分阶数
+        axis: 计算方向，默认沿点轴
+        out: 可选的输出数组
+    """
+    x = np.moveaxis(working(arr), axis, -1)
+    if out is None:
+        out = np.empty(np.shape(arr), dtype=x.dtype)
+    y = np.moveaxis(out, axis, -1)
+    d = np.diff(x, order, axis=-1)
+    y[..., :-order] = d
+    y[..., -order:] = d[..., -1:]
+    return out
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+内存映射的光谱存储，用于超出内存的数据集
+
+数据保存为 .npy 二进制文件并以内存映射方式打开，同名的 .json 附属文件保存波数和元数据。
+各预处理函数可通过 map_blocks 按行块流式处理，峰值内存由块大小决定。
+
+示例:
+    src = SpectralStore.from_text("mapping.txt", "raw.npy", wavenumbers)
+    dst = src.map_blocks(baseline_als, "asls.npy", 1e7, 0.1)
+    dst = dst.map_blocks(partial(IModPoly, dst.wavenumbers), "poly.npy", 6)
+"""
+import json
+import os
+
+import numpy as np
+
+from loader import count_rows, iter_chunks
+
+# 未指定块大小时，每块约占用的字节数
+DEFAULT_BLOCK_BYTES = 64 << 20
+
+
+def _sidecar_path(path):
+    return os.path.splitext(os.fspath(path))[0] + ".json"
+
+
+class SpectralStore:
+    """
+    光谱存储 (n_spectra, n_points)
+
+    属性:
+        data: 内存映射数组
+        wavenumbers: 波数一维数组 (可能为None)
+        metadata: 元数据字典
+    """
+
+    def __init__(self, path, mode='r'):
+        self.path = os.fspath(path)
+        self.data = np.load(self.path, mmap_mode=mode)
+        if self.data.ndim != 2:
+            raise ValueError("光谱存储必须是二维数组 (n_spectra, n_points)")
+        with open(_sidecar_path(self.path), encoding='utf-8') as f:
+            sidecar = json.load(f)
+        wavenumbers = sidecar.get("wavenumbers")
+        self.wavenumbers = None if wavenumbers is None else np.asarray(wavenumbers)
+        self.metadata = sidecar.get("metadata", {})
+
+    @classmethod
+    def create(cls, path, shape, dtype=np.float64, wavenumbers=None,
+               metadata=None):
+        """新建存储文件并以读写方式打开"""
+        if wavenumbers is not None:
+            wavenumbers = np.asarray(wavenumbers, dtype=np.float64).ravel()
+            if len(wavenumbers) != shape[1]:
+                raise ValueError("波数个数与光谱数据点数不一致")
+        mm = np.lib.format.open_memmap(os.fspath(path), mode='w+',
+                                       dtype=dtype, shape=tuple(shape))
+        del mm
+        sidecar = {
+            "shape": list(shape),
+            "dtype": np.dtype(dtype).str,
+            "wavenumbers": None if wavenumbers is None else wavenumbers.tolist(),
+            "metadata": metadata or {},
+        }
+        with open(_sidecar_path(path), 'w', encoding='utf-8') as f:
+            json.dump(sidecar, f, ensure_ascii=False)
+        return cls(path, mode='r+')
+
+    @classmethod
+    def from_text(cls, source, path, wavenumbers=None, layout="columns",
+                  chunk_rows=256, metadata=None, dtype=np.float64, **kwargs):
+        """
+        将文本光谱文件分块转换为存储文件，转换过程中不把整份数据读入内存
+
+        参数:
+            source: 文本文件路径或可 seek 的文件对象
+            path: 目标 .npy 路径
+            wavenumbers: 波数一维数组
+            layout: "columns" (每列一条光谱) 或 "rows" (每行一条光谱)
+            chunk_rows: 每块读取的文本行数
+            dtype: 存储的dtype，如 np.float32
+            **kwargs: 传给 loader.iter_chunks 的解析参数
+        """
+        if layout not in ("columns", "rows"):
+            raise ValueError(f"未知的数据排列方式: {layout}")
+        nrows = count_rows(source, kwargs.get("comments", '#'),
+                           kwargs.get("skiprows", 0),
+                           kwargs.get("encoding", 'utf-8'))
+        store = None
+        filled = 0
+        for arr in iter_chunks(source, chunk_rows, **kwargs):
+            n = arr.shape[0]
+            if store is None:
+                shape = ((arr.shape[1], nrows) if layout == "columns"
+                         else (nrows, arr.shape[1]))
+                store = cls.create(path, shape, dtype=dtype,
+                                   wavenumbers=wavenumbers, metadata=metadata)
+            if layout == "columns":
+                store.data[:, filled:filled + n] = arr.T
+            else:
+                store.data[filled:filled + n] = arr
+            filled += n
+        if store is None:
+            raise ValueError("文件中没有数据")
+        store.flush()
+        return store
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def flush(self):
+        if isinstance(self.data, np.memmap) and self.data.mode != 'r':
+            self.data.flush()
+
+    def default_block_rows(self):
+        row_bytes = self.data.shape[1] * self.data.dtype.itemsize
+        return max(1, DEFAULT_BLOCK_BYTES // max(row_bytes, 1))
+
+    def iter_blocks(self, block_rows=None):
+        """逐块产生 (行切片, 读入内存的数据块)"""
+        block_rows = block_rows or self.default_block_rows()
+        for r0 in range(0, len(self), block_rows):
+            sl = slice(r0, min(r0 + block_rows, len(self)))
+            yield sl, np.array(self.data[sl])
+
+    def map_blocks(self, func, path, *args, block_rows=None, dtype=None,
+                   metadata=None, **kwargs):
+        """
+        按行块调用 func(block, *args, **kwargs)，结果写入新的存储文件
+
+        func 必须逐行独立处理 (如 baseline_als、IModPoly、SGfilter、LPnorm 等)；
+        需要全体光谱统计量的方法 (如MSC) 应先用 mean_spectrum 拟合参考光谱，再按块 transform。
+
+        返回:
+            以读写方式打开的结果存储
+        """
+        dst = None
+        for sl, block in self.iter_blocks(block_rows):
+            res = func(block, *args, **kwargs)
+            if dst is None:
+                dst = self.create(path, (len(self), res.shape[1]),
+                                  dtype=dtype or res.dtype,
+                                  wavenumbers=(self.wavenumbers
+                                               if res.shape[1] == self.shape[1]
+                                               else None),
+                                  metadata=self.metadata if metadata is None else metadata)
+            dst.data[sl] = res
+        if dst is None:
+            raise ValueError("存储中没有数据")
+        dst.flush()
+        return dst
+
+    def mean_spectrum(self, block_rows=None):
+        """按块累加求平均光谱"""
+        total = np.zeros(self.data.shape[1])
+        for _, block in self.iter_blocks(block_rows):
+            total += block.sum(axis=0)
+        return total / len(self)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+处理结果缓存
+
+以 (输入数据哈希, 处理步骤, 参数) 为键缓存各步骤的结果，按占用字节数做LRU淘汰。
+Streamlit 每次交互都会重新运行脚本，只改下游选项时可直接复用上游步骤的结果，
+重复上传同一文件时也可跳过解析。
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# 默认缓存上限 (字节)
+DEFAULT_MAX_BYTES = 1 << 30
+
+
+def bytes_digest(data):
+    """字节数据的哈希值"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def array_digest(arr):
+    """数组内容 (含形状和dtype) 的哈希值"""
+    arr = np.ascontiguousarray(arr)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((arr.shape, arr.dtype.str)).encode())
+    h.update(memoryview(arr).cast('B'))
+    return h.hexdigest()
+
+
+def stage_key(upstream, method, params=None):
+    """由上游结果的键、方法名和参数构成下游结果的键"""
+    payload = json.dumps([upstream, method, params or {}], sort_keys=True,
+                         default=repr, ensure_ascii=False)
+    return bytes_digest(payload.encode())
+
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+def _freeze(value):
+    """缓存中的数组设为只读，防止调用方修改后污染缓存"""
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, (tuple, list)):
+        for v in value:
+            _freeze(v)
+    return value
+
+
+class StageCache:
+    """
+    按字节数限制容量的LRU缓存 (线程安全)
+
+    参数:
+        max_bytes: 缓存中数组占用的总字节数上限
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """存入结果 (数组会被设为只读)；超过上限的单个结果不缓存"""
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return value
+        _freeze(value)
+        with self._lock:
+            if key in self._items:
+                self.nbytes -= self._items.pop(key)[1]
+            self._items[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self.nbytes -= evicted
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+基线参数扫描
+
+在随机抽取的少量光谱上评估一组参数 (AsLS 的 lam/p、I-ModPoly 的 polyorder)，
+给出质量指标，便于在几秒内选定参数后再处理整批数据。
+与参数无关的运算被复用：AsLS 的差分惩罚矩阵按光谱长度缓存、按 lam 缓存，
+同一 lam 的各个 p 在同一任务中计算；I-ModPoly 的范德蒙正交基按阶数缓存。
+不同的参数组在进程池中并行计算 (见 parallel.map_tasks)。
+
+质量指标 (对抽样光谱取平均):
+    roughness: 基线的粗糙度，即基线二阶差分的平方和与原始光谱二阶差分平方和之比，
+               基线跟随峰形起伏 (过拟合) 时变大
+    negative_fraction: 校正后光谱中负值部分的面积占总面积的比例，
+                       基线高于信号 (欠拟合/穿过峰底) 时变大
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from AsLS import baseline_als
+from IModPoly import IModPoly
+from parallel import map_tasks
+from plotdata import sample_spectra
+
+
+def metrics(y, corrected):
+    """按上述定义计算质量指标"""
+    y = np.asarray(y, dtype=np.float64)
+    corrected = np.asarray(corrected, dtype=np.float64)
+    baseline = y - corrected
+    rough_b = np.square(np.diff(baseline, 2, axis=1)).sum(axis=1)
+    rough_y = np.square(np.diff(y, 2, axis=1)).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        roughness = np.where(rough_y > 0, rough_b / rough_y, 0.0)
+        total = np.abs(corrected).sum(axis=1)
+        negative = np.where(total > 0,
+                            np.clip(-corrected, 0, None).sum(axis=1) / total, 0.0)
+    return {"roughness": float(roughness.mean()),
+            "negative_fraction": float(negative.mean())}
+
+
+def _eval_asls(y, lam, ps, niter, warm_start):
+    """同一 lam 的所有 p 在一个任务中计算，共用缓存的惩罚矩阵"""
+    rows = []
+    for p in ps:
+        t0 = time.perf_counter()
+        corrected, iterations = baseline_als(y, lam, p, niter,
+                                             warm_start=warm_start,
+                                             return_iterations=True)
+        rows.append({"lam": lam, "p": p, **metrics(y, corrected),
+                     "mean_iterations": float(iterations.mean()),
+                     "seconds": time.perf_counter() - t0})
+    return rows
+
+
+def _eval_imodpoly(y, wavenumbers, polyorder):
+    t0 = time.perf_counter()
+    corrected = IModPoly(wavenumbers, y, polyorder)
+    return [{"polyorder": polyorder, **metrics(y, corrected),
+             "seconds": time.perf_counter() - t0}]
+
+
+def _sample(y, n_sample, seed):
+    y = np.asarray(y)
+    if n_sample is None or n_sample >= len(y):
+        return y
+    return y[sample_spectra(len(y), n_sample, seed)]
+
+
+def sweep_asls(y, lams, ps, n_sample=50, seed=0, niter=10, warm_start=False,
+               workers=None):
+    """
+    AsLS 参数网格扫描
+
+    参数:
+        y: 光谱 (n_spectra, n_points)
+        lams, ps: lam 和 p 的候选值
+        n_sample: 抽样的光谱条数，None 表示使用全部光谱
+        seed: 抽样的随机种子
+        niter, warm_start: 传给 baseline_als
+        workers: 并行进程数，见 parallel 模块
+
+    返回:
+        DataFrame，每行一组 (lam, p) 及其质量指标、平均迭代次数和耗时
+    """
+    sub = _sample(y, n_sample, seed)
+    ps = [float(p) for p in ps]
+    tasks = [(sub, float(lam), ps, niter, warm_start) for lam in lams]
+    results = map_tasks(_eval_asls, tasks, workers)
+    return pd.DataFrame([r for rows in results for r in rows])
+
+
+def sweep_imodpoly(y, wavenumbers, polyorders, n_sample=50, seed=0,
+                   workers=None):
+    """
+    I-ModPoly 多项式阶数扫描，参数含义见 sweep_asls
+
+    返回:
+        DataFrame，每行一个 polyorder 及其质量指标和耗时
+    """
+    sub = _sample(y, n_sample, seed)
+    wavenumbers = np.asarray(wavenumbers, dtype=np.float64)
+    tasks = [(sub, wavenumbers, int(order)) for order in polyorders]
+    results = map_tasks(_eval_imodpoly, tasks, workers)
+    return pd.DataFrame([r for rows in results for r in rows])
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+逐元素数据变换引擎 (sigmoid / 挤压函数及其归一化版本)
+
+所有变换都以 numpy ufunc 在整个矩阵上原地计算，逐行的最小值/极差通过广播参与运算。
+"""
+import numpy as np
+
+from precision import result_dtype
+
+
+def _output(X, out):
+    """准备输出数组，dtype按精度策略"""
+    if out is None:
+        out = np.empty(X.shape, dtype=result_dtype(X.dtype))
+    elif out.shape != X.shape:
+        raise ValueError("out的形状与输入不一致")
+    return out
+
+
+def _row_min_range(X):
+    """逐行 (沿最后一维) 的最小值与极差，保持维度以便广播"""
+    mi = np.min(X, axis=-1, keepdims=True)
+    diff = np.max(X, axis=-1, keepdims=True) - mi
+    return mi, diff
+
+
+def _sigmoid_inplace(a):
+    # 1 / (1 + exp(-a))
+    np.negative(a, out=a)
+    np.exp(a, out=a)
+    a += 1
+    np.reciprocal(a, out=a)
+    return a
+
+
+def _squashing_inplace(a):
+    # (1 - cos(a * pi)) / 2
+    a *= np.pi
+    np.cos(a, out=a)
+    np.subtract(1, a, out=a)
+    a /= 2
+    return a
+
+
+def sigmoid(X, out=None):
+    X = np.asarray(X)
+    out = _output(X, out)
+    np.copyto(out, X, casting='unsafe')
+    return _sigmoid_inplace(out)
+
+
+def squashing(X, out=None):
+    X = np.asarray(X)
+    out = _output(X, out)
+    np.copyto(out, X, casting='unsafe')
+    return _squashing_inplace(out)
+
+
+def i_sigmoid(X, maxn=10, out=None):
+    X = np.asarray(X)
+    mi, diff = _row_min_range(X)
+    diff = diff / maxn
+    out = _output(X, out)
+    np.subtract(X, mi, out=out, casting='unsafe')
+    out /= diff
+    out -= maxn / 2
+    _sigmoid_inplace(out)
+    out *= diff
+    out *= maxn
+    out += mi
+    return out
+
+
+def i_squashing(X, out=None):
+    X = np.asarray(X)
+    mi, diff = _row_min_range(X)
+    out = _output(X, out)
+    np.subtract(X, mi, out=out, casting='unsafe')
+    out /= diff
+    _squashing_inplace(out)
+    out *= diff
+    out += mi
+    return out
+
+
+TRANSFORMS = {
+    "sigmoid": sigmoid,
+    "squashing": squashing,
+    "i_sigmoid": i_sigmoid,
+    "i_squashing": i_squashing,
+}
+
+
+def transform(X, method, out=None, **kwargs):
+    """
+    对整个矩阵做逐元素变换
+
+    参数:
+        X: 输入数据 (n_samples, n_points)
+        method: 变换名称，"sigmoid"/"squashing"/"i_sigmoid"/"i_squashing"
+        out: 可选的输出数组 (可以就是X本身，实现原地变换)
+        **kwargs: 变换参数，如 i_sigmoid 的 maxn
+
+    返回:
+        变换后的数据，dtype按精度策略
+    """
+    try:
+        func = TRANSFORMS[method]
+    except KeyError:
+        raise ValueError(f"未知的变换方法: {method}") from None
+    return func(X, out=out, **kwargs)
@@ -1,16 +1,66 @@
+from functools import lru_cache
+
 import numpy as np
 import pywt
 
+from precision import working
+
+
+@lru_cache(maxsize=16)
+def _wavelet(name):
+    """按名称缓存小波对象"""
+    return pywt.Wavelet(name)
+
+
+def _mad_sigma(c):
+    """逐行用中位数绝对偏差估计噪声标准差"""
+    return np.median(np.abs(c), axis=-1, keepdims=True) / 0.6745
+
+
+def wavelet_denoise(arr, wavelet='db8', level=None, mode='soft', rule='max',
+                    threshold=0.3):
+    """
+    批量多层小波阈值去噪，沿点轴对整个矩阵一次分解与重构
+
+    参数:
+        arr: 输入光谱 (n_samples, n_points)
+        wavelet: 小波名称 (如'db8'、'sym8'、'coif3')
+        level: 分解层数，None或0表示取最大可分解层数
+        mode: 阈值方式，'soft'/'hard'
+        rule: 阈值规则
+            'max': 每层系数 (含近似系数) 的阈值为 threshold * 该行该层系数的最大值
+            'universal': 由最细一层细节系数估计噪声sigma，所有细节层使用
+                         sigma * sqrt(2 * ln(n_points))
+            'level': 每个细节层分别估计sigma，使用各层自己的通用阈值
+        threshold: 'max' 规则下的阈值比例
+
+    返回:
+        去噪后的光谱，形状与arr相同，dtype按精度策略
+    """
+    x = working(arr)
+    col = x.shape[-1]
+    w = _wavelet(wavelet)
+    if not level:
+        level = pywt.dwt_max_level(col, w.dec_len)
+    coeffs = pywt.wavedec(x, w, level=level, axis=-1)
+
+    if rule == 'max':
+        for j in range(len(coeffs)):
+            value = threshold * np.max(coeffs[j], axis=-1, keepdims=True)
+            coeffs[j] = pywt.threshold(coeffs[j], value, mode)
+    elif rule in ('universal', 'level'):
+        factor = np.sqrt(2 * np.log(col))
+        sigma = _mad_sigma(coeffs[-1])
+        for j in range(1, len(coeffs)):
+            if rule == 'level':
+                sigma = _mad_sigma(coeffs[j])
+            coeffs[j] = pywt.threshold(coeffs[j], sigma * factor, mode)
+    else:
+        raise ValueError(f"未知的阈值规则: {rule}")
+
+    # 奇数长度时重构结果会多出一个点
+    return pywt.waverec(coeffs, w, axis=-1)[..., :col]
+
 
 def waveletlinear(arr, threshold = 0.3):
-    row = arr.shape[0]
-    col = arr.shape[1]
-    datarec = np.zeros((row, col))
-    w = pywt.Wavelet('db8')
-    for i in range(row):
-        maxlev = pywt.dwt_max_level(col, w.dec_len)
-        coeffs = pywt.wavedec(arr[i], 'db8', level=maxlev)
-        for j in range(0, len(coeffs)):
-            coeffs[j] = pywt.threshold(coeffs[j], threshold*max(coeffs[j]))
-        datarec[i] = pywt.waverec(coeffs, 'db8')
-    return datarec
+    return wavelet_denoise(arr, 'db8', threshold=threshold)